@@ -0,0 +1,217 @@
+################################################################################
+# Import Libraries
+################################################################################
+import os
+import sys
+import csv
+import time
+import argparse
+import tempfile
+import shutil
+import tracemalloc
+import logging
+import contextlib
+import yaml
+
+# Profile against the offline stand-in, never against a live API Server
+import IxiaFakeNet
+sys.modules['IxNetwork'] = IxiaFakeNet
+
+import IxiaNtastic
+from IxiaNtastic import (IxiaConnector, IxiaStatFrame, IxiaCsvSnapshot, IxNetProxy, IxiaYamlExtractor, IxiaStatCollector,
+                         buildPortTuples, TRAFFIC_STATS, STAT_VIEWS)
+
+# Captions of a synthetic "Flow Statistics" view
+FLOW_CAPTIONS = ['Tx Port', 'Rx Port', 'Traffic Item', 'Source/Dest Value Pair', 'Tx Frames', 'Rx Frames', 'Frames Delta',
+                 'Loss %', 'Tx Frame Rate', 'Rx Frame Rate', 'Tx L1 Rate (bps)', 'Rx L1 Rate (bps)', 'Rx Bytes',
+                 'Store-Forward Avg Latency (ns)', 'Store-Forward Min Latency (ns)', 'Store-Forward Max Latency (ns)',
+                 'First TimeStamp', 'Last TimeStamp']
+
+################################################################################################
+#                                   SYNTHETIC STATISTICS                                       #
+#   ROWS SHAPED LIKE THE "Flow Statistics" VIEW, EITHER AS THE NESTED LIST RETURNED BY         #
+#   '-rowValues' OR AS THE CSV FILE WRITTEN BY TakeViewCSVSnapshot.                            #
+################################################################################################
+def syntheticFlowRow(index, ports=32, trafficItems=8):
+    txFrames = 1000000 + index % 1000
+    rxFrames = txFrames - (index * 7 % 500 if index % 4 == 0 else 0)
+    return ['Port{}'.format(index % ports + 1), 'Port{}'.format((index + 1) % ports + 1), 'Traffic Item {}'.format(index % trafficItems + 1),
+            '10.{}.{}.1-20.{}.{}.1'.format(index // 65536 % 256, index // 256 % 256, index // 256 % 256, index % 256),
+            str(txFrames), str(rxFrames), str(txFrames - rxFrames), '{:.3f}'.format((txFrames - rxFrames) * 100.0 / txFrames),
+            '8127.000', '8127.000', '10000000000.000', '10000000000.000', str(rxFrames * 1500),
+            str(800 + index % 400), str(500 + index % 300), str(1200 + index % 3800), '00:00:00.512', '00:02:03.129']
+
+
+def syntheticRowValues(rows):
+    return [[syntheticFlowRow(index)] for index in range(rows)]
+
+
+def writeSyntheticCsv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(FLOW_CAPTIONS)
+        for index in range(rows):
+            writer.writerow(syntheticFlowRow(index))
+
+################################################################################################
+#                                   SYNTHETIC CONFIGURATION                                    #
+#   ixaDetails.yaml SHAPED CONFIGURATION WITH "ports" PORTS, "deviceGroups" DEVICE-GROUPS PER  #
+#   PORT (ETHERNET/IPV4/OSPF + A NETWORK-GROUP EACH) AND "multiplier" DEVICES PER GROUP.       #
+################################################################################################
+def syntheticConfig(ports, deviceGroups, multiplier):
+    portList = []
+    for index in range(ports):
+        groups = []
+        for group in range(deviceGroups):
+            groups.append({'-name': 'DG{}_{}'.format(index + 1, group + 1),
+                           '-multiplier': multiplier,
+                           'ethernet/1': {'-mtu': {'/singleValue': {'-value': 9214}},
+                                          'ipv4/1': {'-address': {'/counter': {'-start': '10.{}.{}.1'.format(index, group), '-step': '0.0.0.1'}},
+                                                     '-gatewayIp': {'/counter': {'-start': '10.{}.{}.254'.format(index, group), '-step': '0.0.0.0'}},
+                                                     '-resolveGateway': {'/singleValue': {'-value': True}},
+                                                     'ospfv2/1': {'port/1': {'-maxMtu': {'/singleValue': {'-value': 9214}}}}}},
+                           'networkGroup/1': {'-name': 'Net{}_{}'.format(index + 1, group + 1),
+                                              'ipv4PrefixPools/1': {'-networkAddress': {'/counter': {'-start': '100.{}.{}.1'.format(index, group), '-step': '0.0.0.1'}},
+                                                                    '-prefixLength': {'/singleValue': {'-value': 32}},
+                                                                    '-numberOfAddressesAsy': {'/singleValue': {'-value': 10}}}}})
+        portList.append({'slot': index // 16 + 1, 'port': index % 16 + 1,
+                         'topology': {'name': 'Topology{}'.format(index + 1), 'deviceGroup': groups}})
+    config = {'ixiaVM': '127.0.0.1', 'ixiaAPIServerPort': 8009, 'ixVersion': 9.00,
+              'ixiaChassis': [{'name': 'benchChassis', 'ports': portList}]}
+    if ports > 1:
+        config['traffic'] = [{'name': 'Bench_IPv4', 'endpoints': [{'sources': ['Topology1/DG1_1'], 'destinations': ['Topology2/DG2_1']}]}]
+    return config
+
+################################################################################################
+#                                   MEASUREMENT                                                #
+################################################################################################
+def measure(stage, function, ixNet=None):
+    roundTrips = ixNet.roundTrips() if ixNet else 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = function()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'stage': stage, 'seconds': round(elapsed, 3), 'peakMB': round(peak / 1048576.0, 1),
+            'roundTrips': ixNet.roundTrips() - roundTrips if ixNet else '-', 'result': result}
+
+
+def printResults(results):
+    print("{:<44} {:>12} {:>10} {:>10}".format('Stage', 'Round Trips', 'Seconds', 'Peak MB'))
+    for entry in results:
+        print("{:<44} {:>12} {:>10} {:>10}".format(entry['stage'], entry['roundTrips'], entry['seconds'], entry['peakMB']))
+
+################################################################################################
+#   Configuration and statistics hot paths against the offline IxNet                           #
+################################################################################################
+def benchConfig(ports, deviceGroups, multiplier, flows, batchMode, batchSize=0, proxies=None):
+    IxiaFakeNet.IxNet.flowRows = flows
+    mode = 'batch' if batchMode else 'legacy'
+    config = syntheticConfig(ports, deviceGroups, multiplier)
+    yamlDir = tempfile.mkdtemp()
+    yamlPath = os.path.join(yamlDir, 'bench.yaml')
+    with open(yamlPath, 'w') as f:
+        yaml.safe_dump(config, f)
+    try:
+        # First load parses and fills the cache, the second one only unpickles it
+        results = [measure('[{}] yaml load (parse)'.format(mode), lambda: IxiaYamlExtractor(yamlPath, os.path.join(yamlDir, 'cache'))),
+                   measure('[{}] yaml load (cached)'.format(mode), lambda: IxiaYamlExtractor(yamlPath, os.path.join(yamlDir, 'cache')))]
+    finally:
+        shutil.rmtree(yamlDir)
+    config = results[-1]['result']
+
+    connectResult = measure('[{}] connect'.format(mode), lambda: IxiaConnector(config['ixiaVM'], config['ixiaAPIServerPort'], 'benchChassis',
+                                                                               config['ixVersion'], batchMode, batchSize))
+    ixHandler = connectResult['result']
+    ixNet = ixHandler.ixNet
+    ixNet.name = '{} build'.format(mode)
+    if proxies is not None:
+        proxies.append(ixNet)
+    results.append(connectResult)
+    PortTupleList = buildPortTuples(config['ixiaChassis'])
+    results.append(measure('[{}] port assign'.format(mode), lambda: ixHandler.ConnectPhysicalPorts(PortTupleList), ixNet))
+    results.append(measure('[{}] scenario build'.format(mode), ixHandler.setScenarios, ixNet))
+    results.append(measure('[{}] protocol start'.format(mode), ixHandler.startProtocols, ixNet))
+
+    if config.get('traffic'):
+        trafficResult = measure('[{}] traffic build'.format(mode), lambda: ixHandler.createTrafficItems(config['traffic']), ixNet)
+        results.append(trafficResult)
+
+        def runTraffic():
+            ixHandler.StartTraffic(trafficResult['result'])
+            ixHandler.waitForTraffic('stopped', 5)
+            ixHandler.StopTraffic()
+        results.append(measure('[{}] traffic run'.format(mode), runTraffic, ixNet))
+
+    results.append(measure('[{}] stats rowValues ({} flows)'.format(mode, flows), ixHandler.getTrafficStatistics, ixNet))
+    # Every STAT_VIEWS view, one after the other and then concurrently (one connection per worker)
+    serialCollector = IxiaStatCollector(ixHandler, maxWorkers=1)
+    results.append(measure('[{}] stats {} views serial'.format(mode, len(STAT_VIEWS)), serialCollector.snapshot))
+    serialCollector.close()
+    # The session's collector opens its connections on the first collection and reuses them on the next ones
+    collector = ixHandler.statisticsCollector()
+    results.append(measure('[{}] stats {} views parallel'.format(mode, len(STAT_VIEWS)), collector.snapshot))
+    results.append(measure('[{}] stats {} views parallel (reused)'.format(mode, len(STAT_VIEWS)), collector.snapshot))
+    ixHandler.closeStatConnections()
+    snapshotDir = tempfile.mkdtemp()
+    try:
+        results.append(measure('[{}] stats snapshot ({} flows)'.format(mode, flows),
+                               lambda: IxiaCsvSnapshot(ixHandler.takeViewSnapshot('Flow Statistics', snapshotDir)).toFrame(TRAFFIC_STATS), ixNet))
+    finally:
+        for name in os.listdir(snapshotDir):
+            os.remove(os.path.join(snapshotDir, name))
+        os.rmdir(snapshotDir)
+    return results
+
+################################################################################################
+#   rowValues vs CSV snapshot ingestion of a large flow view                                   #
+################################################################################################
+def benchStatIngest(rows):
+    def viaRowValues():
+        # The whole view arrives as one deserialized response before a single row is picked
+        rowValues = syntheticRowValues(rows)
+        return len(IxiaStatFrame(FLOW_CAPTIONS, (statVal for statValList in rowValues for statVal in statValList), TRAFFIC_STATS))
+
+    fd, csvPath = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        writeSyntheticCsv(csvPath, rows)
+        results = [measure('rowValues ingest ({} flows)'.format(rows), viaRowValues),
+                   measure('CSV snapshot ingest ({} flows)'.format(rows), lambda: len(IxiaCsvSnapshot(csvPath).toFrame(TRAFFIC_STATS)))]
+    finally:
+        os.remove(csvPath)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks for the IxiaNtastic hot paths against the offline IxNet stand-in")
+    parser.add_argument('--suite', choices=['all', 'config', 'ingest'], default='all', help="Benchmarks to run")
+    parser.add_argument('--ports', type=int, default=8, help="Ports in the synthetic configuration")
+    parser.add_argument('--device-groups', type=int, default=4, help="Device-Groups per port")
+    parser.add_argument('--multiplier', type=int, default=10, help="Devices per Device-Group")
+    parser.add_argument('--flows', type=int, default=20000, help="Rows in the synthetic flow statistics view")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every API round trip")
+    parser.add_argument('--batch-size', type=int, default=0, help="batchSize used by the batched build")
+    parser.add_argument('--trace', help="Write the per-call API trace of the config suite to this Chrome trace JSON file")
+    args = parser.parse_args()
+
+    IxiaNtastic.CaptureThat = logging.getLogger()
+    IxiaNtastic.CaptureThat.addHandler(logging.NullHandler())
+    IxiaFakeNet.IxNet.callLatency = args.latency
+
+    results = []
+    proxies = []
+    if args.suite in ('all', 'config'):
+        for batchMode in (False, True):
+            results.extend(benchConfig(args.ports, args.device_groups, args.multiplier, args.flows, batchMode, args.batch_size, proxies))
+    if args.suite in ('all', 'ingest'):
+        results.extend(benchStatIngest(args.flows))
+    printResults(results)
+    if args.trace and proxies:
+        for ixNet in proxies:
+            print(ixNet.name)
+            for table in ixNet.summaryTables():
+                print(table)
+        print("API call trace written to {}".format(IxNetProxy.exportTrace(proxies, args.trace)))
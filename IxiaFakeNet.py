@@ -0,0 +1,285 @@
+################################################################################
+# Import Libraries
+################################################################################
+import csv
+import time
+import threading
+
+################################################################################################
+#                                                                                              #
+#*_*_*_*_*_*_*_*_*_*_*_*_*_*_*   CLASS IxNet (OFFLINE STAND-IN)    *_*_*_*_*_*_*_*_*_*_*_*_*_*_*#
+#                                                                                              #
+#   In-process replacement for IxNetwork.IxNet, used to profile IxiaNtastic without an API     #
+#   Server or a chassis. Register the module in place of IxNetwork before importing            #
+#   IxiaNtastic:                                                                               #
+#           sys.modules['IxNetwork'] = IxiaFakeNet                                             #
+#                                                                                              #
+#   Objects live in a dictionary keyed by their handle. add() hands out temporary handles      #
+#   ("vport:L1") that commit() turns into real ones ("vport:1") and remapIds() resolves, like  #
+#   the API Server does. Any attribute never set reads back as a multivalue handle, so the     #
+#   treeBreakdown/setMultiAttr paths behave as on a real configuration.                        #
+#                                                                                              #
+#   Class Variables (set them before IxiaConnector is created)                                 #
+#       -> callLatency: Seconds added to every call that would be a round trip                 #
+#       -> verbLatency: Per-verb override of callLatency, e.g. {'commit': 0.05}                #
+#       -> flowRows: Rows in the synthetic "Flow Statistics" view                              #
+#       -> statPorts / statTrafficItems: Ports and Traffic Items of the synthetic views        #
+#          ("Port Statistics", "Traffic Item Statistics", "Protocols Summary")                 #
+#       -> pageSize: Rows per page of the statistic views                                      #
+#       -> trafficRunTime: Seconds the traffic keeps running after 'start'                     #
+#       -> lossFreeRate: Percent line rate above which the flows lose frames. None keeps the   #
+#                        fixed synthetic loss of the flow rows                                 #
+#                                                                                              #
+################################################################################################
+class IxNet:
+    callLatency = 0.0
+    verbLatency = {}
+    flowRows = 100
+    statPorts = 32
+    statTrafficItems = 8
+    pageSize = 50
+    trafficRunTime = 0.05
+    lossFreeRate = None
+
+    FLOW_CAPTIONS = ['Tx Port', 'Rx Port', 'Traffic Item', 'Source/Dest Value Pair', 'Tx Frames', 'Rx Frames', 'Frames Delta',
+                     'Loss %', 'Tx Frame Rate', 'Rx Frame Rate', 'Store-Forward Avg Latency (ns)', 'First TimeStamp', 'Last TimeStamp']
+    PORT_CAPTIONS = ['Stat Name', 'Port Name', 'Line Speed', 'Link State', 'Frames Tx.', 'Valid Frames Rx.', 'Bytes Tx.', 'Bytes Rx.',
+                     'CRC Errors']
+    TRAFFIC_ITEM_CAPTIONS = ['Traffic Item', 'Tx Frames', 'Rx Frames', 'Frames Delta', 'Loss %', 'Tx Frame Rate', 'Rx Frame Rate',
+                             'Store-Forward Avg Latency (ns)']
+    PROTOCOL_CAPTIONS = ['Protocol Type', 'Sessions Up', 'Sessions Down', 'Sessions Not Started', 'Sessions Total']
+    PROTOCOLS = ['IPv4', 'OSPFv2-RTR']
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.__reset__()
+
+    def __reset__(self):
+        self.root = '::ixNet::OBJ-/'
+        self.objects = {self.root: {'type': 'root', 'parent': None, 'attrs': {}, 'children': {}}}
+        self.pending = []
+        self.remapped = {}
+        self.multivalues = {}
+        self.tempCount = 0
+        self.lastIndex = {}                 # (parent, child type) -> last instance number given, never reused
+        self.protocolsStarted = False
+        self.trafficStartedAt = None
+        self.statsCleared = False           # clearStats until the next start: the Traffic Items report no Tx frames
+        self.currentPage = {}
+        self.currentRate = 100.0
+
+    def __delay__(self, verb):
+        latency = self.verbLatency.get(verb, self.callLatency)
+        if latency:
+            time.sleep(latency)
+
+    def __handle__(self, handle):
+        handle = handle.replace('OBJ-//', 'OBJ-/')
+        return self.remapped.get(handle, handle)
+
+    def __node__(self, handle):
+        handle = self.__handle__(handle)
+        if handle not in self.objects:
+            # Paths built by concatenation (e.g. ".../configElement:1/frameSize") exist implicitly
+            self.objects[handle] = {'type': handle.rsplit('/', 1)[-1].split(':')[0], 'parent': None, 'attrs': {}, 'children': {}}
+        return self.objects[handle]
+
+    ################################################################################
+    #                       Calls answered locally by IxNetwork
+    ################################################################################
+    def getRoot(self):
+        return self.root
+
+    def readFrom(self, path, *args):
+        return ('readFrom', path)
+
+    def writeTo(self, path, *args):
+        return ('writeTo', path)
+
+    def setDebug(self, *args):
+        return '::ixNet::OK'
+
+    ################################################################################
+    #                       Calls answered by the API Server
+    ################################################################################
+    def connect(self, *args):
+        self.__delay__('connect')
+        return '::ixNet::OK'
+
+    def disconnect(self):
+        self.__delay__('disconnect')
+        return '::ixNet::OK'
+
+    def add(self, parent, childType, *args):
+        self.__delay__('add')
+        with self.lock:
+            parent = self.__handle__(parent)
+            self.__node__(parent)
+            self.tempCount += 1
+            handle = '{}{}{}:L{}'.format(parent, '' if parent.endswith('/') else '/', childType, self.tempCount)
+            self.objects[handle] = {'type': childType, 'parent': parent, 'attrs': dict(zip(args[::2], args[1::2])), 'children': {}}
+            self.pending.append(handle)
+            return handle
+
+    def commit(self):
+        self.__delay__('commit')
+        with self.lock:
+            for handle in self.pending:
+                node = self.objects.pop(handle)
+                parent = self.__handle__(node['parent'])
+                node['parent'] = parent
+                siblings = self.objects[parent]['children'].setdefault(node['type'], [])
+                index = self.lastIndex[(parent, node['type'])] = self.lastIndex.get((parent, node['type']), 0) + 1
+                real = '{}{}{}:{}'.format(parent, '' if parent.endswith('/') else '/', node['type'], index)
+                siblings.append(real)
+                self.objects[real] = node
+                self.remapped[handle] = real
+            self.pending = []
+        return '::ixNet::OK'
+
+    def remapIds(self, handles):
+        self.__delay__('remapIds')
+        if not isinstance(handles, list):
+            handles = [handles]
+        return [self.__handle__(handle) for handle in handles]
+
+    def remove(self, handle):
+        self.__delay__('remove')
+        with self.lock:
+            handle = self.__handle__(handle)
+            node = self.objects.get(handle)
+            if node and node['parent']:
+                self.objects[node['parent']]['children'].get(node['type'], []).remove(handle)
+            for other in [other for other in self.objects if other == handle or other.startswith(handle + '/')]:
+                del self.objects[other]
+        return '::ixNet::OK'
+
+    def getList(self, parent, childType):
+        self.__delay__('getList')
+        return list(self.__node__(parent)['children'].get(childType, []))
+
+    def setAttribute(self, handle, name, value):
+        self.__delay__('setAttribute')
+        self.__set__(handle, name, value)
+        return '::ixNet::OK'
+
+    def setMultiAttribute(self, handle, *args):
+        self.__delay__('setMultiAttribute')
+        for name, value in zip(args[::2], args[1::2]):
+            self.__set__(handle, name, value)
+        return '::ixNet::OK'
+
+    def __set__(self, handle, name, value):
+        if name == '-currentPage':
+            self.currentPage[handle] = int(value)
+        elif name == '-rate':
+            self.currentRate = float(value)
+        elif name == '-vports' and not isinstance(value, list):
+            value = [self.__handle__(value)]
+        self.__node__(handle)['attrs'][name] = value
+
+    def getAttribute(self, handle, name):
+        self.__delay__('getAttribute')
+        handle = self.__handle__(handle)
+        if '/statistics/view:' in handle:
+            return self.__viewAttribute__(handle, name)
+        node = self.__node__(handle)
+        if name in node['attrs']:
+            return node['attrs'][name]
+        if name == '-vports':
+            return []
+        if name == '-state':
+            return self.__trafficState__() if node['type'] == 'traffic' else 'up'
+        if name == '-isConnected':
+            return 'true'
+        if name == '-status':
+            return 'started' if self.protocolsStarted else 'notStarted'
+        if name == '-sessionStatus':
+            return ['up' if self.protocolsStarted else 'notStarted']
+        with self.lock:
+            return self.multivalues.setdefault((handle, name), '::ixNet::OBJ-/multivalue:{}'.format(len(self.multivalues) + 1))
+
+    def execute(self, verb, *args):
+        self.__delay__('execute')
+        if verb == 'newConfig':
+            self.__reset__()
+        elif verb == 'startAllProtocols':
+            self.protocolsStarted = True
+        elif verb == 'stopAllProtocols':
+            self.protocolsStarted = False
+        elif verb == 'start':
+            self.trafficStartedAt = time.time()
+            self.statsCleared = False
+        elif verb == 'clearStats':
+            self.statsCleared = True
+        elif verb == 'stop':
+            self.trafficStartedAt = None
+        elif verb == 'copyFile':
+            self.__writeSnapshot__(args[1][1])
+        return '::ixNet::OK'
+
+    ################################################################################
+    #                       Synthetic traffic and statistics
+    ################################################################################
+    def __trafficState__(self):
+        if self.trafficStartedAt is not None and time.time() - self.trafficStartedAt < self.trafficRunTime:
+            return 'started'
+        return 'stopped'
+
+    def flowRow(self, index):
+        txFrames = 1000000 + index % 1000
+        if self.lossFreeRate is None:
+            rxFrames = txFrames - (index * 7 % 500 if index % 4 == 0 else 0)
+        else:
+            rxFrames = txFrames - int(txFrames * max(0.0, self.currentRate - self.lossFreeRate) / self.currentRate)
+        return ['Port{}'.format(index % 32 + 1), 'Port{}'.format((index + 1) % 32 + 1), 'Traffic Item {}'.format(index % 8 + 1),
+                '10.0.{}.{}-20.0.{}.{}'.format(index // 256 % 256, index % 256, index // 256 % 256, index % 256),
+                str(txFrames), str(rxFrames), str(txFrames - rxFrames), '{:.3f}'.format((txFrames - rxFrames) * 100.0 / txFrames),
+                '8127.000', '8127.000', str(800 + index % 400), '00:00:00.512', '00:02:03.129']
+
+    def portRow(self, index):
+        flows = len(range(index, self.flowRows, self.statPorts))
+        return ['chassis/Card01/Port{:02d}'.format(index + 1), 'Port{}'.format(index + 1), '100GE', 'Link Up',
+                str(flows * 1000000), str(flows * 1000000), str(flows * 1500000000), str(flows * 1500000000), '0']
+
+    def trafficItemRow(self, index):
+        flows = 0 if self.statsCleared else len(range(index, self.flowRows, self.statTrafficItems))
+        return ['Traffic Item {}'.format(index + 1), str(flows * 1000000), str(flows * 1000000), '0', '0.000',
+                '8127.000', '8127.000', str(800 + index)]
+
+    def protocolRow(self, index):
+        return [self.PROTOCOLS[index], str(self.statPorts), '0', '0', str(self.statPorts)]
+
+    # (captions, row builder, number of rows) of the view named in "handle". Unknown views read as Flow Statistics
+    def __view__(self, handle):
+        view = handle.split('view:"', 1)[-1].split('"', 1)[0]
+        if view == 'Port Statistics':
+            return self.PORT_CAPTIONS, self.portRow, self.statPorts
+        if view == 'Traffic Item Statistics':
+            return self.TRAFFIC_ITEM_CAPTIONS, self.trafficItemRow, self.statTrafficItems
+        if view == 'Protocols Summary':
+            return self.PROTOCOL_CAPTIONS, self.protocolRow, len(self.PROTOCOLS)
+        return self.FLOW_CAPTIONS, self.flowRow, self.flowRows
+
+    def __viewAttribute__(self, handle, name):
+        captions, row, rows = self.__view__(handle)
+        totalPages = max(1, (rows + self.pageSize - 1) // self.pageSize)
+        if name == '-columnCaptions':
+            return list(captions)
+        if name == '-totalPages':
+            return totalPages
+        if name == '-currentPage':
+            return self.currentPage.get(handle, 1)
+        if name == '-isReady':
+            return 'true'
+        if name == '-rowValues':
+            first = (self.currentPage.get(handle, 1) - 1) * self.pageSize
+            return [[row(index)] for index in range(first, min(first + self.pageSize, rows))]
+        return self.__node__(handle)['attrs'].get(name)
+
+    def __writeSnapshot__(self, localPath):
+        with open(localPath, 'w', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(self.FLOW_CAPTIONS)
+            for index in range(self.flowRows):
+                writer.writerow(self.flowRow(index))
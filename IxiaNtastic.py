@@ -1,12 +1,48 @@
 ################################################################################
 # Import Libraries
 ################################################################################
-import IxNetwork
 import time
 import json
-import yaml
-from prettytable import PrettyTable
+import csv
+import os
+import mmap
+import hashlib
+import pickle
+import argparse
+import importlib
+from array import array
+from operator import itemgetter
 import logging
+import traceback
+import threading
+import contextlib
+import functools
+import re
+import queue
+import ipaddress
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+
+################################################################################################
+#   Heavy or optional modules are imported on first use, so that --validate-only/--dry-run    #
+#   and a cached configuration never pay for IxNetwork, numpy, prettytable or the YAML parser #
+################################################################################################
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+IxNetwork = LazyModule('IxNetwork')
+yaml = LazyModule('yaml')
+numpy = LazyModule('numpy')
+prettytable = LazyModule('prettytable')
 
 
 # DEFINE THE TRAFFIC ITEMS THAT YOU WANT THEM TO BE IN THE TABLE FOR STATISTICS
@@ -26,19 +62,789 @@ SPECIAL_ATTR_LIST = ['-name','-connectedTo','-count','-multiplier','-numberOfAdd
 #Yaml file definition
 YAML_FILE = "ixaDetails.yaml"
 
+# Parsed and validated YAML files are pickled here as "<path key>-<SHA-256 of the content>.pickle", only
+# the latest entry of each YAML file is kept. Bump CONFIG_CACHE_VERSION whenever the validation/normalization
+# changes, to invalidate the older entries
+CONFIG_CACHE_DIR = ".ixiantastic_cache"
+CONFIG_CACHE_VERSION = 4
+
+# Top level keys every configuration needs, and the optional ones with their default values
+CONFIG_REQUIRED_KEYS = ['ixiaVM', 'ixiaAPIServerPort', 'ixVersion', 'ixiaChassis']
+CONFIG_DEFAULTS = {'batchMode': False, 'batchSize': 0, 'reconfigure': False, 'traffic': []}
+
+# Child-objects are written "<type>/<N>" in the YAML ("ethernet/1", "ethernet/2", ...)
+CHILD_KEY = re.compile(r'^(.+)/(\d+)$')
+
+# Placeholders substituted in the strings of a templated port/device-group, e.g. "Topology{port}"
+TEMPLATE_FIELDS = re.compile(r'\{(chassis|slot|port|index|dg|topology)\}')
+
+# Multivalue patterns are matched case-sensitively by setMultiAttr: spellings normalized on load
+MULTIVALUE_KEYS = {'/singlevalue': '/singleValue', '/counter': '/counter'}
+
+# Link-up polling for ConnectPhysicalPorts (seconds)
+PORT_LINKUP_TIMEOUT = 120
+PORT_POLL_INTERVAL = 1
+
+# Per-condition timeouts (seconds) and polling backoff of the wait engine
+WAIT_TIMEOUTS = {'protocols': 300, 'trafficStarted': 60, 'trafficStopped': 60, 'trafficRun': 600, 'statsView': 60}
+WAIT_INITIAL_INTERVAL = 0.5
+WAIT_BACKOFF = 1.5
+WAIT_MAX_INTERVAL = 10
+
+# Views read by IxiaStatCollector after every run, each with the columns kept (None keeps every column)
+STAT_VIEWS = {'Flow Statistics': TRAFFIC_STATS,
+              'Port Statistics': ['Port Name', 'Link State', 'Frames Tx.', 'Valid Frames Rx.', 'Bytes Tx.', 'Bytes Rx.', 'CRC Errors'],
+              'Traffic Item Statistics': ['Traffic Item', 'Tx Frames', 'Rx Frames', 'Frames Delta', 'Loss %', 'Store-Forward Avg Latency (ns)'],
+              'Protocols Summary': ['Protocol Type', 'Sessions Up', 'Sessions Down', 'Sessions Not Started', 'Sessions Total']}
+STAT_WORKERS = 4
+
+# How the views are joined into the per-port and per-Traffic-Item snapshot: (view, key column), first view first
+STAT_JOINS = {'port': [('Port Statistics', 'Port Name'), ('Flow Statistics', 'Tx Port')],
+              'trafficItem': [('Traffic Item Statistics', 'Traffic Item'), ('Flow Statistics', 'Traffic Item')]}
+
+# Views polled by streamStatistics and the polling interval (seconds)
+STREAM_VIEWS = ['Flow Statistics']
+STREAM_INTERVAL = 5
+
+# Folder on the API Server where view CSV snapshots are written, and the local folder they are copied to
+SNAPSHOT_REMOTE_DIR = 'C:\\Users\\Public\\Documents\\IxiaNtastic'
+SNAPSHOT_LOCAL_DIR = '.'
+
+# Traffic Item attributes used unless the "traffic" entry in the YAML overrides them (keys starting with '-')
+TRAFFIC_ITEM_DEFAULTS = {'-trafficType': 'ipv4', '-allowSelfDestined': False, '-trafficItemType': 'l2L3', '-mergeDestinations': True,
+                         '-egressEnabled': False, '-srcDestMesh': 'manyToMany', '-enabled': True, '-routeMesh': 'fullMesh',
+                         '-transmitMode': 'interleaved', '-biDirectional': True, '-hostsPerNetwork': 1}
+
+# Stack appended to a "Topology/DeviceGroup" traffic endpoint when the endpoint does not name one
+TRAFFIC_ENDPOINT_STACK = {'ipv4': 'ethernet:1/ipv4:1', 'ipv6': 'ethernet:1/ipv6:1', 'ethernetVlan': 'ethernet:1'}
+
+# Traffic sweep defaults: RFC 2544 frame sizes, percent line rates of the matrix, frames per trial, and
+# the binary search bounds/resolution (percent line rate) and accepted loss (%) of the zero-loss search
+SWEEP_DEFAULTS = {'frameSizes': [64, 128, 256, 512, 1024, 1280, 1518], 'rates': [10, 50, 100], 'frameCount': 100000,
+                  'minRate': 0.1, 'maxRate': 100, 'resolution': 0.5, 'lossTolerance': 0.0, 'maxTrials': 20}
+
+# Last applied configuration and handle map of a session, read back by the "reconfigure" mode ({} is the session)
+STATE_FILE = "IxiaNtastic_state_{}.json"
+
+# Stack objects whose '-sessionStatus' is polled by startProtocols (ipv4 'up' also means the gateway is resolved)
+SESSION_STATUS_TYPES = ['ipv4', 'ipv6', 'ospfv2', 'ospfv3', 'bgpIpv4Peer', 'bgpIpv6Peer', 'isisL3', 'ldpBasicRouter']
+
+# IxNet calls answered by the client library itself. Everything else is counted as a round trip to the API Server
+LOCAL_IXNET_CALLS = ['getRoot', 'readFrom', 'writeTo', 'setDebug', 'getVersion']
+
+# IxNet calls whose changes wait for the next commit, which is accounted to the objects they touched
+BUFFERED_IXNET_CALLS = ['add', 'remove', 'setAttribute', 'setMultiAttribute']
+
+# Latency histogram buckets (upper bounds in milliseconds) and the trace written at the end of the run
+LATENCY_BUCKETS_MS = [1, 5, 10, 50, 100, 500, 1000]
+TRACE_FILE = "IxiaNtastic_trace.json"
+TRACE_MAX_EVENTS = 200000
+# Every IxNetProxy times its calls from this origin, so that merged traces (sessions, statistics workers) line up
+TRACE_ORIGIN = time.perf_counter()
+
+################################################################################################
+#                                   IXNET INSTRUMENTATION                                      #
+#   THIN PASS-THROUGH AROUND IxNetwork.IxNet. EVERY CALL IS FORWARDED AS-IS AND RECORDED WITH  #
+#   ITS VERB ('execute:<command>' FOR execute), THE OBJECT PATH PATTERN (HANDLE WITHOUT THE    #
+#   INSTANCE NUMBERS, e.g. "/topology/deviceGroup/ethernet") AND ITS LATENCY, UNDER THE STAGE  #
+#   SET WITH stage(). A MULTIVALUE IS ACCOUNTED TO THE ATTRIBUTE IT WAS READ FROM              #
+#   ("/topology/deviceGroup/ethernet/ipv4/-address/counter") AND A commit TO THE COMMON PATH   #
+#   OF THE OBJECTS CHANGED SINCE THE PREVIOUS ONE. GIVES ROUND-TRIP COUNTS, PER-STAGE LATENCY  #
+#   HISTOGRAMS, A SUMMARY BY VERB                                                              #
+#   AND BY PATH, AND A CHROME TRACE (chrome://tracing or ui.perfetto.dev).                     #
+################################################################################################
+class IxNetProxy:
+    def __init__(self, ixNet, name='IxNet'):
+        self._ixNet = ixNet
+        self.name = name
+        self.callCount = {}
+        self.histograms = {}            # stage -> verb -> {'count', 'total', 'max', 'buckets'}
+        self.pathTotals = {}            # path pattern -> [count, total seconds]
+        self.multivalueOwners = {}      # multivalue handle -> path pattern of the attribute it holds
+        self.uncommitted = []           # path patterns changed since the last commit
+        self.events = []
+        self.droppedEvents = 0
+        self.currentStage = 'setup'
+        self.startTime = TRACE_ORIGIN
+        self.__lock__ = threading.Lock()
+
+    def __getattr__(self, verb):
+        target = getattr(self._ixNet, verb)
+        if not callable(target) or verb in LOCAL_IXNET_CALLS:
+            return target
+
+        def tracedCall(*args):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = target(*args)
+                return result
+            finally:
+                self.__record__(verb, args, start, time.perf_counter(), result)
+        return tracedCall
+
+    # "::ixNet::OBJ-//traffic/trafficItem:2/configElement:1" -> "/traffic/trafficItem/configElement"
+    @staticmethod
+    def pathPattern(handle):
+        return re.sub(r'^/+', '/', re.sub(r':L?\d+', '', handle.replace('::ixNet::OBJ-', ''))) or '/'
+
+    # Path pattern of "handle", multivalues under the attribute they belong to
+    def objectPath(self, handle):
+        match = re.match(r'(::ixNet::OBJ-/multivalue:\d+)(.*)$', handle)
+        if match and match.group(1) in self.multivalueOwners:
+            return self.multivalueOwners[match.group(1)] + self.pathPattern(match.group(2)).rstrip('/')
+        return self.pathPattern(handle)
+
+    # Longest common path of "paths": "/topology/deviceGroup/ethernet" and "/topology/deviceGroup" -> "/topology/deviceGroup"
+    @staticmethod
+    def commonPath(paths):
+        return '/'.join(os.path.commonprefix([path.split('/') for path in paths])) or '/'
+
+    # Account "multivalue" to the attribute "attr" of "handle". Multivalues resolved through getAttribute are labelled
+    # on the fly, this is for the ones known from elsewhere (e.g. the state file)
+    def labelMultivalue(self, multivalue, handle, attr):
+        self.multivalueOwners[multivalue] = self.pathPattern(handle) + '/' + attr
+
+    def __record__(self, verb, args, start, end, result=None):
+        if verb == 'execute' and args:
+            verb = 'execute:' + str(args[0])
+            args = args[1:]
+        handle = args[0] if args and isinstance(args[0], str) and args[0].startswith('::ixNet::') else ''
+        path = self.objectPath(handle) if handle else '-'
+        if args and isinstance(args[0], list) and args[0] and all(str(item).startswith('::ixNet::') for item in args[0]):
+            path = self.commonPath([self.objectPath(item) for item in args[0]])       # remapIds/generate of several objects
+        if verb == 'getAttribute' and handle and isinstance(result, str) and result.startswith('::ixNet::OBJ-/multivalue:'):
+            self.labelMultivalue(result, handle, args[1])
+        latency = end - start
+        bucket = next((index for index, limit in enumerate(LATENCY_BUCKETS_MS) if latency * 1000 < limit), len(LATENCY_BUCKETS_MS))
+        with self.__lock__:
+            if verb in BUFFERED_IXNET_CALLS and handle:
+                self.uncommitted.append(path)
+            elif verb == 'commit':
+                path = self.commonPath(self.uncommitted) if self.uncommitted else '(nothing to commit)'
+                self.uncommitted = []
+            self.callCount[verb] = self.callCount.get(verb, 0) + 1
+            entry = self.histograms.setdefault(self.currentStage, {}).setdefault(verb, {'count': 0, 'total': 0.0, 'max': 0.0,
+                                                                                       'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)})
+            entry['count'] += 1
+            entry['total'] += latency
+            entry['max'] = max(entry['max'], latency)
+            entry['buckets'][bucket] += 1
+            totals = self.pathTotals.setdefault(path, [0, 0.0])
+            totals[0] += 1
+            totals[1] += latency
+            if len(self.events) < TRACE_MAX_EVENTS:
+                self.events.append((verb, self.currentStage, path, start - self.startTime, latency, threading.get_ident()))
+            else:
+                self.droppedEvents += 1
+
+    # Every call made inside the "with" block is accounted to "stage". Stages nest
+    @contextlib.contextmanager
+    def stage(self, stage):
+        previous = self.currentStage
+        self.currentStage = stage
+        try:
+            yield
+        finally:
+            self.currentStage = previous
+
+    def roundTrips(self):
+        return sum(self.callCount.values())
+
+    def report(self):
+        return ", ".join("{}={}".format(verb, count) for verb, count in sorted(self.callCount.items()))
+
+    def traceEvents(self, pid=1):
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': self.name}}]
+        for verb, stage, path, start, latency, thread in self.events:
+            events.append({'name': verb, 'cat': stage, 'ph': 'X', 'pid': pid, 'tid': thread,
+                           'ts': round(start * 1e6, 1), 'dur': round(latency * 1e6, 1), 'args': {'path': path}})
+        return events
+
+    # Chrome trace JSON of one or more proxies (one process row per session)
+    @staticmethod
+    def exportTrace(proxies, path=TRACE_FILE):
+        events = []
+        for pid, proxy in enumerate(proxies, 1):
+            events.extend(proxy.traceEvents(pid))
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def summaryTables(self, topPaths=15):
+        Verb_Table = prettytable.PrettyTable()
+        Verb_Table.field_names = ['Stage', 'API Verb', 'Calls', 'Total (s)', 'Mean (ms)', 'Max (ms)'] + \
+                                 ['<{}ms'.format(limit) for limit in LATENCY_BUCKETS_MS] + ['>={}ms'.format(LATENCY_BUCKETS_MS[-1])]
+        for stage, verbs in self.histograms.items():
+            for verb, entry in sorted(verbs.items(), key=lambda item: -item[1]['total']):
+                Verb_Table.add_row([stage, verb, entry['count'], round(entry['total'], 3), round(entry['total'] * 1000 / entry['count'], 2),
+                                    round(entry['max'] * 1000, 2)] + entry['buckets'])
+        Path_Table = prettytable.PrettyTable()
+        Path_Table.field_names = ['Object Path', 'Calls', 'Total (s)']
+        for path, (count, total) in sorted(self.pathTotals.items(), key=lambda item: -item[1][1])[:topPaths]:
+            Path_Table.add_row([path, count, round(total, 3)])
+        return Verb_Table, Path_Table
+
+
+# Accounts every IxNet call made by an IxiaConnector method to "stage"
+def apiStage(stage):
+    def decorate(method):
+        @functools.wraps(method)
+        def staged(self, *args, **kwargs):
+            with self.ixNet.stage(stage):
+                return method(self, *args, **kwargs)
+        return staged
+    return decorate
+
+################################################################################################
+#                                   OBJECT-HANDLE CACHE                                        #
+#   PER-SESSION CACHE OF RESOLVED MULTIVALUE HANDLES, KEYED BY (OBJECT HANDLE, ATTRIBUTE).     #
+#   ONLY ::ixNet:: HANDLES ARE CACHED. ENTRIES ARE DROPPED ON newConfig AND WHEN AN OBJECT     #
+#   (OR ANY OF ITS PARENTS) IS REMOVED. THE MULTIVALUE HANDLES ARE SAVED IN THE STATE FILE,    #
+#   SO THAT reconfigure() REWRITES A CHANGED ATTRIBUTE WITHOUT RESOLVING ITS MULTIVALUE AGAIN. #
+################################################################################################
+class IxiaHandleCache:
+    def __init__(self):
+        self.multivalues = {}
+        self.hits = 0
+        self.misses = 0
+
+    def getMultivalue(self, ixNet, handle, attr):
+        if not handle.startswith('::ixNet::'):
+            self.misses += 1
+            return ixNet.getAttribute(handle, attr)
+        if (handle, attr) in self.multivalues:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.multivalues[(handle, attr)] = ixNet.getAttribute(handle, attr)
+        return self.multivalues[(handle, attr)]
+
+    def invalidate(self, handle):
+        def isStale(objHandle):
+            return objHandle == handle or objHandle.startswith(handle + '/')
+        self.multivalues = {k: v for k, v in self.multivalues.items() if not isStale(k[0])}
+
+    def clear(self):
+        self.multivalues = {}
+
+    def report(self):
+        return "hits={} misses={} multivalues={}".format(self.hits, self.misses, len(self.multivalues))
+
+################################################################################################
+#                                   WAIT ENGINE                                                #
+#   POLLS A CONDITION WITH ADAPTIVE BACKOFF (WAIT_INITIAL_INTERVAL, GROWING BY WAIT_BACKOFF    #
+#   UP TO WAIT_MAX_INTERVAL) UNTIL IT HOLDS OR THE TIMEOUT EXPIRES. EVERY WAIT IS RECORDED     #
+#   IN "WaitTimes" AS (SECONDS TAKEN, CONDITION MET) UNDER ITS NAME.                           #
+################################################################################################
+class IxiaWaitEngine:
+    def __init__(self, interval=WAIT_INITIAL_INTERVAL, backoff=WAIT_BACKOFF, maxInterval=WAIT_MAX_INTERVAL):
+        self.interval = interval
+        self.backoff = backoff
+        self.maxInterval = maxInterval
+        self.WaitTimes = {}
+
+    def waitUntil(self, name, condition, timeout, interval=None, maxInterval=None):
+        start = time.time()
+        interval = interval or self.interval
+        maxInterval = maxInterval or self.maxInterval
+        while True:
+            met = condition()
+            elapsed = time.time() - start
+            if met or elapsed >= timeout:
+                break
+            time.sleep(min(interval, timeout - elapsed))
+            interval = min(interval * self.backoff, maxInterval)
+
+        self.WaitTimes.setdefault(name, []).append((round(elapsed, 2), met))
+        if met:
+            CaptureThat.info("WAIT_DONE: {} after {:.2f}s".format(name, elapsed))
+        else:
+            print("Timed out after {}s waiting for {}".format(timeout, name))
+            CaptureThat.warning("WAIT_TIMEOUT: {} not met within {}s".format(name, timeout))
+        return met
+
+    def report(self):
+        return ", ".join("{}={}".format(name, [elapsed for elapsed, met in waits]) for name, waits in self.WaitTimes.items())
+
+################################################################################################
+#                                   STATISTICS SINK                                            #
+#   APPEND-ONLY OUTPUT FOR streamStatistics. ".jsonl" FILES GET ONE JSON OBJECT PER ROW,       #
+#   ".csv" FILES GET ONE FILE PER VIEW (<name>_<view>.csv) SINCE EVERY VIEW HAS ITS OWN        #
+#   COLUMNS. ROWS ARE FLUSHED AS THEY ARRIVE, NOTHING IS KEPT IN MEMORY.                       #
+################################################################################################
+class IxiaStatSink:
+    def __init__(self, path):
+        self.path = path
+        self.isJson = path.endswith('.jsonl')
+        self.files = {}
+        self.writers = {}
+
+    def __open__(self, view):
+        if self.isJson:
+            fileName = self.path
+        else:
+            base = self.path[:-4] if self.path.endswith('.csv') else self.path
+            fileName = "{}_{}.csv".format(base, view.replace(' ', '_').replace('/', '_'))
+        if fileName not in self.files:
+            self.files[fileName] = open(fileName, 'a', newline='')
+        return fileName
+
+    def write(self, timestamp, view, row):
+        fileName = self.__open__(view)
+        if self.isJson:
+            record = {'timestamp': timestamp, 'view': view}
+            record.update(row)
+            self.files[fileName].write(json.dumps(record) + "\n")
+        else:
+            if fileName not in self.writers:
+                self.writers[fileName] = csv.writer(self.files[fileName])
+                if self.files[fileName].tell() == 0:
+                    self.writers[fileName].writerow(['timestamp'] + list(row.keys()))
+            self.writers[fileName].writerow([timestamp] + list(row.values()))
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        self.writers = {}
+
+################################################################################################
+#                                   STATISTICS FRAME                                           #
+#   COLUMNAR HOLDER FOR A STATISTIC VIEW. THE REQUESTED COLUMNS ARE RESOLVED TO CAPTION        #
+#   INDEXES ONCE, NUMERIC COLUMNS (FRAMES, RATES, LOSS %, LATENCY) ARE KEPT AS FLOAT NUMPY     #
+#   ARRAYS AND TEXT COLUMNS (PORTS, TRAFFIC ITEM, TIMESTAMPS) AS OBJECT ARRAYS. EMPTY CELLS    #
+#   BECOME NaN. PRETTYTABLE OUTPUT IS ONLY A VIEW OVER THE ARRAYS (toPrettyTable).             #
+################################################################################################
+class IxiaStatFrame:
+    def __init__(self, captions=(), rows=(), columns=TRAFFIC_STATS):
+        self.columns = [column for column in columns if column in captions]
+        self.indexes = [captions.index(column) for column in self.columns]
+        picked = [itemgetter(*self.indexes)(row) for row in rows] if self.columns else []
+        if len(self.columns) == 1:
+            picked = [(value,) for value in picked]
+        self.data = {}
+        for column, values in zip(self.columns, zip(*picked) if picked else [()] * len(self.columns)):
+            self.data[column] = self.__toArray__(values)
+
+    # Frame over columns that are already arrays, e.g. from IxiaCsvSnapshot
+    @classmethod
+    def fromArrays(cls, data):
+        statFrame = cls(columns=[])
+        statFrame.columns = list(data)
+        statFrame.data = dict(data)
+        return statFrame
+
+    # Stack frames with the same columns into one, labelling every row with its source in "labelColumn"
+    @classmethod
+    def concat(cls, frames, labels, labelColumn='Session'):
+        frames = [statFrame for statFrame in frames if len(statFrame.columns)]
+        if not frames:
+            return cls(columns=[])
+        data = {labelColumn: numpy.array([label for statFrame, label in zip(frames, labels) for index in range(len(statFrame))], dtype=object)}
+        for column in frames[0].columns:
+            data[column] = numpy.concatenate([statFrame.data[column] for statFrame in frames])
+        return cls.fromArrays(data)
+
+    @staticmethod
+    def __toArray__(values):
+        text = numpy.array(values, dtype=object)
+        try:
+            return numpy.where(text == '', 'nan', text).astype(float)
+        except (TypeError, ValueError):
+            return text
+
+    def __len__(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    def __getitem__(self, column):
+        return self.data[column]
+
+    def isNumeric(self, column):
+        return self.data[column].dtype.kind == 'f'
+
+    def row(self, index):
+        return {column: self.data[column][index] for column in self.columns}
+
+    def rows(self, mask=None):
+        indexes = range(len(self)) if mask is None else numpy.flatnonzero(mask)
+        return [self.row(index) for index in indexes]
+
+    # Sum every numeric column per value of "keyColumn". Latency columns are averaged over the rows that
+    # report one and Loss % is recomputed from the summed frame counts
+    def aggregate(self, keyColumn):
+        keys, inverse = numpy.unique(self.data[keyColumn].astype(str), return_inverse=True)
+        sums = {}
+        for column in self.columns:
+            if not self.isNumeric(column):
+                continue
+            values = self.data[column]
+            sums[column] = numpy.bincount(inverse, weights=numpy.nan_to_num(values), minlength=len(keys))
+            if 'Latency' in column:
+                reported = numpy.bincount(inverse, weights=~numpy.isnan(values), minlength=len(keys))
+                with numpy.errstate(divide='ignore', invalid='ignore'):
+                    sums[column] = sums[column] / reported
+        if 'Loss %' in sums and 'Tx Frames' in sums and 'Rx Frames' in sums:
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                sums['Loss %'] = numpy.where(sums['Tx Frames'] > 0, (sums['Tx Frames'] - sums['Rx Frames']) * 100.0 / sums['Tx Frames'], 0.0)
+        return {str(key): {column: float(values[index]) for column, values in sums.items()} for index, key in enumerate(keys)}
+
+    def perTrafficItem(self):
+        return self.aggregate('Traffic Item')
+
+    def perPort(self, portColumn='Tx Port'):
+        return self.aggregate(portColumn)
+
+    def topN(self, n=10, column='Loss %'):
+        order = numpy.argsort(-numpy.nan_to_num(self.data[column], nan=-numpy.inf), kind='stable')[:n]
+        return [self.row(index) for index in order]
+
+    def topLoss(self, n=10):
+        return self.topN(n, 'Loss %')
+
+    # Rows where "column" is above "threshold" (below it when "above" is False)
+    def exceeds(self, column, threshold, above=True):
+        values = self.data[column]
+        return self.rows(values > threshold if above else values < threshold)
+
+    # {column: threshold} -> {column: offending rows}, only for the columns that have offenders
+    def checkThresholds(self, thresholds):
+        return {column: offenders for column, offenders in
+                ((column, self.exceeds(column, limit)) for column, limit in thresholds.items() if column in self.data) if offenders}
+
+    # Counters print as integers ("1000", not "1000.0"), empty cells as blanks, the rest as they are
+    @staticmethod
+    def displayValue(value):
+        if isinstance(value, float):
+            if value != value:
+                return ''
+            if value.is_integer():
+                return int(value)
+        return value
+
+    def toPrettyTable(self):
+        Stat_Table = prettytable.PrettyTable()
+        Stat_Table.field_names = self.columns
+        for index in range(len(self)):
+            Stat_Table.add_row([self.displayValue(self.data[column][index]) for column in self.columns])
+        return Stat_Table
+
+################################################################################################
+#                                   CSV SNAPSHOT READER                                        #
+#   INCREMENTAL READER FOR A VIEW SNAPSHOT (TakeViewCSVSnapshot) COPIED FROM THE API SERVER.   #
+#   THE FILE IS MEMORY-MAPPED AND PARSED ONE LINE AT A TIME. rows() YIELDS ROWS, toFrame()     #
+#   FILLS TYPED COLUMNS (array('d') FOR NUMBERS) SO THE FILE NEVER BECOMES A LIST OF ROWS.     #
+################################################################################################
+class IxiaCsvSnapshot:
+    def __init__(self, path):
+        self.path = path
+        with open(self.path, 'rb') as f:
+            header = f.readline().decode('utf-8-sig')
+        self.captions = next(csv.reader([header]))
+
+    def rows(self):
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.readline()                                   # Skip the caption line
+                for row in csv.reader(line.decode('utf-8') for line in iter(mm.readline, b'')):
+                    if row:
+                        yield row
+
+    def toFrame(self, columns=TRAFFIC_STATS):
+        picked = [column for column in columns if column in self.captions]
+        indexes = [self.captions.index(column) for column in picked]
+        numeric = {column: array('d') for column in picked}
+        text = {}
+        for row in self.rows():
+            for column, index in zip(picked, indexes):
+                if column in text:
+                    continue
+                value = row[index]
+                try:
+                    numeric[column].append(float(value) if value != '' else float('nan'))
+                except ValueError:
+                    # First non-numeric cell: the column is text, its cells are read again as written below
+                    del numeric[column]
+                    text[column] = []
+        if text:
+            textIndexes = [(text[column], self.captions.index(column)) for column in text]
+            for row in self.rows():
+                for values, index in textIndexes:
+                    values.append(row[index])
+        data = {}
+        for column in picked:
+            if column in text:
+                data[column] = numpy.array(text[column], dtype=object)
+            else:
+                data[column] = numpy.frombuffer(numeric[column], dtype=float)
+        return IxiaStatFrame.fromArrays(data)
+
+################################################################################################
+#                                   PORT TUPLES                                                #
+#   (chassis, slot, port, topology name, topology tree) FOR EVERY PORT OF "chassisList", AS    #
+#   EXPECTED BY IxiaConnector.ConnectPhysicalPorts                                             #
+################################################################################################
+def buildPortTuples(chassisList):
+    return list(iterPortTuples(chassisList))
+
+
+################################################################################################
+#                                   YAML TEMPLATES                                             #
+#   A PORT ENTRY MAY LIST A RANGE OF SLOTS/PORTS ("1-4", "1-4,9"): IT STANDS FOR ONE PORT PER  #
+#   (SLOT, PORT) PAIR, AND {chassis} {slot} {port} {index} IN ITS STRINGS ARE REPLACED BY THE  #
+#   VALUES OF EACH ONE ({index} COUNTS THE PORTS OF THE ENTRY FROM 1). A DEVICE-GROUP WITH     #
+#   "repeat: N" STANDS FOR N DEVICE-GROUPS, {dg} BEING 1..N AND {topology} THE TOPOLOGY NAME.  #
+#   A "/counter" WITH "-instanceStep" STARTS EVERY COPY OF ITS DEVICE-GROUP (ACROSS THE PORTS  #
+#   AND REPEATS OF THE ENTRY) "-instanceStep" FURTHER THAN THE PREVIOUS ONE.                   #
+#       ports:                                                                                 #
+#         - slot: 1                                                                            #
+#           port: 1-64                                                                         #
+#           topology:                                                                          #
+#             name: Topology{port}                                                             #
+#             deviceGroup:                                                                     #
+#               - -name: DG{port}_{dg}                                                         #
+#                 repeat: 4                                                                    #
+#                 ethernet/1:                                                                  #
+#                   ipv4/1:                                                                    #
+#                     -address:                                                                #
+#                       /counter: {-start: 10.0.0.1, -step: 0.0.0.1, -instanceStep: 0.0.1.0}   #
+#   PORTS ARE EXPANDED BY iterPortTuples AND DEVICE-GROUPS BY expandDeviceGroups, BOTH         #
+#   GENERATORS: EACH DEVICE-GROUP IS MATERIALIZED ONLY WHEN IT IS PUSHED TO THE API SERVER.    #
+################################################################################################
+def parseRange(value):
+    if isinstance(value, int):
+        yield value
+        return
+    for part in str(value).split(','):
+        first, sep, last = part.strip().partition('-')
+        first, last = int(first), int(last if sep else first)
+        if last < first:
+            raise ValueError("Reversed range '{}'".format(part.strip()))
+        for number in range(first, last + 1):
+            yield number
+
+
+def iterPortTuples(chassisList):
+    for every in chassisList:
+        for eachPort in every["ports"]:
+            pairs = itertools.product(parseRange(eachPort["slot"]), parseRange(eachPort["port"]))
+            for index, (slot, port) in enumerate(pairs, 1):
+                instance = {'chassis': every["name"], 'slot': slot, 'port': port, 'index': index}
+                topology = dict(eachPort["topology"], instance=instance)   # The deviceGroup templates stay shared
+                topology["name"] = substituteTemplate(topology["name"], instance)
+                yield (every["name"], slot, port, topology["name"], topology)
+
+
+def expandDeviceGroups(topology):
+    instance = dict(topology.get('instance', {'index': 1}), topology=topology['name'])
+    for template in topology['deviceGroup']:
+        repeat = template.get('repeat', 1)
+        for dg in range(1, repeat + 1):
+            instance['dg'] = dg
+            copy = (instance['index'] - 1) * repeat + dg - 1
+            yield substituteTemplate({key: value for key, value in template.items() if key != 'repeat'}, instance, copy)
+
+
+# -name of every Device-Group expandDeviceGroups yields for "topology", without building their sub-trees
+def deviceGroupNames(topology):
+    instance = dict(topology.get('instance', {'index': 1}), topology=topology['name'])
+    for template in topology['deviceGroup']:
+        for dg in range(1, template.get('repeat', 1) + 1):
+            instance['dg'] = dg
+            yield substituteTemplate(template.get('-name'), instance)
+
+
+def deviceGroupCount(topology):
+    return sum(template.get('repeat', 1) for template in topology['deviceGroup'])
+
+
+# Copy of "value" with the placeholders replaced and every "-instanceStep" counter moved "copy" steps
+def substituteTemplate(value, instance, copy=0):
+    if isinstance(value, str):
+        return TEMPLATE_FIELDS.sub(lambda match: str(instance.get(match.group(1), match.group(0))), value)
+    if isinstance(value, list):
+        return [substituteTemplate(item, instance, copy) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {key: substituteTemplate(item, instance, copy) for key, item in value.items() if key != '-instanceStep'}
+    if '-instanceStep' in value and '-start' in result:
+        result['-start'] = offsetValue(result['-start'], value['-instanceStep'], copy)
+    return result
+
+
+# "start" moved "count" times by "step": IPv4/IPv6 addresses, MAC addresses or numbers
+def offsetValue(start, step, count):
+    if isinstance(start, (int, float)):
+        return start + step * count
+    try:
+        return str(ipaddress.ip_address(start) + int(ipaddress.ip_address(step)) * count)
+    except ValueError:
+        pass
+    if re.match(r'^([0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2}$', start) and re.match(r'^([0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2}$', str(step)):
+        mac = '{:012x}'.format((int(start.replace(':', ''), 16) + int(step.replace(':', ''), 16) * count) % (1 << 48))
+        return ':'.join(mac[position:position + 2] for position in range(0, 12, 2))
+    raise ValueError("Cannot offset '{}' by '{}'".format(start, step))
+
+
+# "ethernet/2" -> "ethernet". None for attributes and multivalue patterns
+def childObjectType(key):
+    match = CHILD_KEY.match(key)
+    return match.group(1) if match else None
+
 ################################################################################################
 #                                   YAML EXTRACTOR                                             #
 #   THIS FUNCTION IS USED TO EXTRACT YAML-CONTENTS FROM  YAML_FILE WHICH IS LATER USED TO      #
 #   TO PARSE TO CREATE TOPOLOGY AND CREATED TRAFFIC FLOWS                                      #
+#   THE FIRST DOCUMENT IS PARSED WITH THE LIBYAML SAFE LOADER (PURE-PYTHON SafeLoader WHEN     #
+#   PyYAML IS BUILT WITHOUT IT), VALIDATED, NORMALIZED AND PICKLED UNDER "cacheDir". AN        #
+#   UNCHANGED FILE IS READ BACK FROM THE CACHE WITHOUT PARSING. ONLY THE LATEST ENTRY OF EACH  #
+#   FILE IS KEPT. cacheDir=None DISABLES IT.                                                   #
 ################################################################################################
-def IxiaYamlExtractor():
+def IxiaYamlExtractor(path=YAML_FILE, cacheDir=CONFIG_CACHE_DIR):
     CaptureThat.info("````````````````````````````````` YAML PARSER ''''''''''''''''''''''''''''''''''''")
-    with open(YAML_FILE) as f:
-        yamlParser = yaml.load_all(f)
-        print(yamlParser)
-        for data in yamlParser:
-            CaptureThat.info(data)
-            return(data)
+    with open(path, 'rb') as f:
+        content = f.read()
+    cacheFile = None
+    if cacheDir:
+        pathKey = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+        digest = hashlib.sha256(content + str(CONFIG_CACHE_VERSION).encode()).hexdigest()
+        cacheFile = os.path.join(cacheDir, "{}-{}.pickle".format(pathKey, digest))
+        try:
+            with open(cacheFile, 'rb') as f:
+                data = pickle.load(f)
+            CaptureThat.info("YAML_CACHE: {} read from {}".format(path, cacheFile))
+            return data
+        except (IOError, pickle.UnpicklingError, EOFError):
+            pass
+
+    Loader = getattr(yaml, 'CSafeLoader', None) or yaml.SafeLoader
+    data = next(iter(yaml.load_all(content, Loader=Loader)), None)
+    data = validateConfig(data, path)
+    CaptureThat.info("YAML_PARSE: {} parsed with {}".format(path, Loader.__name__))
+    if cacheFile:
+        os.makedirs(cacheDir, exist_ok=True)
+        with open(cacheFile + '.tmp', 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(cacheFile + '.tmp', cacheFile)
+        # Earlier entries of the same file (and entries named by content only) can never be read again
+        for name in os.listdir(cacheDir):
+            if name.endswith('.pickle') and (name.startswith(pathKey + '-') or '-' not in name) and name != os.path.basename(cacheFile):
+                try:
+                    os.remove(os.path.join(cacheDir, name))
+                    CaptureThat.debug("YAML_CACHE: Removed the stale entry {}".format(name))
+                except OSError:
+                    pass
+    return data
+
+
+# Check the structure the connector relies on and fill in the defaults. Every problem found is
+# reported at once in a single ValueError
+def validateConfig(data, path=YAML_FILE):
+    errors = []
+    if not isinstance(data, dict):
+        raise ValueError("{}: expected a mapping at the top level, found {}".format(path, type(data).__name__))
+    for key in CONFIG_REQUIRED_KEYS:
+        if key not in data:
+            errors.append("missing '{}'".format(key))
+    for key, default in CONFIG_DEFAULTS.items():
+        data.setdefault(key, default)
+
+    topologies = {}                             # topology name -> names of its Device-Groups
+    for chassisIndex, chassis in enumerate(data.get('ixiaChassis') or []):
+        where = "ixiaChassis[{}]".format(chassisIndex)
+        if not isinstance(chassis, dict) or 'name' not in chassis or not isinstance(chassis.get('ports'), list):
+            errors.append("{}: needs a 'name' and a 'ports' list".format(where))
+            continue
+        for portIndex, port in enumerate(chassis['ports']):
+            where = "ixiaChassis[{}].ports[{}]".format(chassisIndex, portIndex)
+            if not isinstance(port, dict) or 'slot' not in port or 'port' not in port:
+                errors.append("{}: needs 'slot' and 'port'".format(where))
+                continue
+            topology = port.get('topology')
+            if not isinstance(topology, dict) or 'name' not in topology:
+                errors.append("{}: needs a 'topology' with a 'name'".format(where))
+                continue
+            try:
+                slots, ports = list(parseRange(port['slot'])), list(parseRange(port['port']))
+            except ValueError:
+                errors.append("{}: 'slot'/'port' must be numbers or increasing ranges such as 1-4,9".format(where))
+                continue
+            topology['deviceGroup'] = topology.get('deviceGroup') or []
+            templates = []
+            for deviceGroup in topology['deviceGroup']:
+                if not isinstance(deviceGroup, dict):
+                    errors.append("{}: every deviceGroup entry must be a mapping".format(where))
+                    continue
+                if not isinstance(deviceGroup.get('repeat', 1), int) or deviceGroup.get('repeat', 1) < 1:
+                    errors.append("{}: 'repeat' must be a positive number".format(where))
+                    continue
+                normalizeTree(deviceGroup)
+                templates.append(deviceGroup)
+            for index, (slot, number) in enumerate(itertools.product(slots, ports), 1):
+                instance = {'chassis': chassis['name'], 'slot': slot, 'port': number, 'index': index}
+                name = substituteTemplate(topology['name'], instance)
+                if name in topologies:
+                    errors.append("{}: duplicate topology name '{}'".format(where, name))
+                names, duplicates = set(), set()
+                for dgName in deviceGroupNames({'name': name, 'instance': instance, 'deviceGroup': templates}):
+                    if dgName is not None and dgName in names:
+                        duplicates.add(dgName)
+                    names.add(dgName)
+                if duplicates:
+                    errors.append("{}: Device-Group names {} repeated in topology '{}', template them with {{dg}}".format(where, sorted(duplicates), name))
+                topologies[name] = names
+                if index == 1:
+                    # Move every "-instanceStep" counter once: a -start/-instanceStep pair that cannot be offset fails now, not in setScenarios
+                    for template in templates:
+                        try:
+                            substituteTemplate(template, dict(instance, topology=name, dg=1), 1)
+                        except (ValueError, TypeError) as error:
+                            errors.append("{}: Device-Group '{}': {}".format(where, template.get('-name'), error))
+    if not data.get('ixiaChassis'):
+        errors.append("'ixiaChassis' must list at least one chassis")
+
+    for trafficIndex, every in enumerate(data['traffic'] or []):
+        where = "traffic[{}]".format(trafficIndex)
+        if not isinstance(every, dict) or 'name' not in every or not isinstance(every.get('endpoints'), list):
+            errors.append("{}: needs a 'name' and an 'endpoints' list".format(where))
+            continue
+        for endpoint in every['endpoints']:
+            if not isinstance(endpoint, dict):
+                errors.append("{} ({}): every endpoints entry must be a mapping with 'sources' and 'destinations', found '{}'".format(
+                    where, every['name'], endpoint))
+                continue
+            for side in ('sources', 'destinations'):
+                if isinstance(endpoint.get(side), str):
+                    endpoint[side] = [endpoint[side]]
+                if not endpoint.get(side) or not isinstance(endpoint[side], list):
+                    errors.append("{} ({}): endpoint without a list of {}".format(where, every['name'], side))
+                    continue
+                for name in endpoint[side]:
+                    # "Topology/DeviceGroup[/stack]" must name a Device-Group of the configuration, ixNet handles are taken as is
+                    if str(name).startswith('::ixNet::'):
+                        continue
+                    parts = str(name).split('/', 2)
+                    if len(parts) < 2 or parts[0] not in topologies or parts[1] not in topologies[parts[0]]:
+                        errors.append("{} ({}): {} '{}' does not match any Topology/DeviceGroup".format(where, every['name'], side, name))
+    if errors:
+        raise ValueError("{} is not a valid configuration:\n  ".format(path) + "\n  ".join(errors))
+    return data
+
+
+# Spell every multivalue pattern the way setMultiAttr looks it up ('/singlevalue' -> '/singleValue')
+def normalizeTree(tree):
+    for key in list(tree):
+        value = tree[key]
+        if key.lower() in MULTIVALUE_KEYS and key != MULTIVALUE_KEYS[key.lower()]:
+            tree[MULTIVALUE_KEYS[key.lower()]] = tree.pop(key)
+        if isinstance(value, dict):
+            normalizeTree(value)
 
 ################################################################################################
 #                                                                                              #
@@ -49,23 +855,42 @@ def IxiaYamlExtractor():
 #       -> apiPort: TCP port of the Ixia API Server expecting connection (default: 8009)       #
 #       -> chassis: DNS name of the Ixia-Chassis                                               #
 #       -> ixVersion: Version of IxNetwork running on the Chassis                              #
+#       -> batchMode: Build the YAML tree with deferred commits (default: False)               #
+#       -> batchSize: With batchMode, commit every N queued objects and every N attribute      #
+#                     operations. 0 commits once per topology (default: 0)                     #
+#       -> stateFile: State file of the last applied configuration. When it exists, the        #
+#                     running configuration is kept (no newConfig) for reconfigure()           #
+#                     (default: None)                                                          #
 #                                                                                              #
 #   Public Functions:                                                                          #
 #       -> ConnectPhysicalPorts():  Create Virtual Ports and attach the physical ports to it   #
 #       -> treeBreakdown():         Main function to break YAML tree elements, parse and       #
 #                                   create topology, scenarios and traffic elements.           #
+#       -> treeBreakdownBatched():  Deferred-commit variant of treeBreakdown (batchMode)        #
+#       -> getMultivalue():         Cached lookup of the multivalue handle of an attribute      #
+#       -> removeObject():          Remove an object and drop its cached handles               #
 #       -> setScenarios():          Function to create scenarios                               #
-#       -> startProtocols():        Function to Start Protocols                                #
+#       -> reconfigure():           Apply only the YAML changes since the last run              #
+#       -> saveState():             Record the applied configuration and its handles           #
+#       -> startProtocols():        Function to Start Protocols and wait for the sessions      #
 #       -> stopProtocols():         Function to stop Protocols                                 #
 #       ----------------------------------------------------------------------------------     #
 #       -> createTraffic():         Function to Create Traffic                                 #
+#       -> createTrafficItems():    Create every Traffic Item of the YAML "traffic" section    #
 #       -> StartTraffic():          Function to Start Traffic                                  #
 #       -> StopTraffic():           Function to Stop Traffic                                   #
+#       -> setTrafficParameters():  Change frame size/rate/frame count of existing Traffic Items#
+#       -> runTrafficTrial():       Regenerate, run and collect one fixedFrameCount trial      #
+#       -> waitForTraffic():        Wait until the traffic reaches a state ('started'/'stopped')#
 #       -> getTrafficStatistics():  Function to Obtain Statistics after running traffic        #
+#       -> streamStatistics():      Generator polling statistic views while traffic runs       #
+#       -> newConnection():         Extra API Server connection (IxiaStatCollector workers)     #
+#       -> statisticsCollector():   IxiaStatCollector of the session, created on first use      #
+#       -> closeStatConnections():  Disconnect the connections of that collector                #
 #                                                                                              #
 ################################################################################################
 class IxiaConnector:
-    def __init__(self, vmip, apiPort, chassis, ixVersion):
+    def __init__(self, vmip, apiPort, chassis, ixVersion, batchMode=False, batchSize=0, stateFile=None):
         self.vPortList = []
         self.InterfaceList = []
         self.ipList = []
@@ -75,9 +900,31 @@ class IxiaConnector:
         self.CHASSIS_DNS = chassis  # IP Fails to work. Always have the DNS entry of the IXIA
         self.CHASSIS_IXIA_VERSION = ixVersion
         self.ToplgyperPort = {}
+        self.TopologyperVport = {}          # vport -> topology index, filled when the topology is created
+        self.ChassisObjs = {}               # chassis hostname -> availableHardware/chassis handle
+        self.PortLinkUpTime = {}            # vport name -> seconds taken for the link to come up
+        self.TopologyNames = {}             # topology name -> topology handle
+        self.DeviceGroupNames = {}          # (topology name, device-group name) -> device-group handle
+        self.TrafficItems = []
+        self.ConfigElements = {}            # Traffic Item -> its configElements, one per Endpoint-Set
+        self.deviceGroup = []
+        self.ProtocolList = []              # stack objects polled for '-sessionStatus'
+        self.waiter = IxiaWaitEngine()
+        self.batchMode = batchMode
+        self.batchSize = batchSize
+        self.__batchQueue__ = []
+        self.handleCache = IxiaHandleCache()
+        self.PortTuples = []                # port tuples applied on the API Server
+        self.HandleMap = {}                 # YAML path ("Topology1/NormalIPv4_1/ethernet/1") -> handle
+        self.__pendingPaths__ = {}          # temporary handle -> YAML path, until remapIds
+        self.statConnections = []           # connections opened by newConnection(), listed in the trace even once closed
+        self.statCollector = None           # IxiaStatCollector of the session, see statisticsCollector()
+        self.snapshotSuffix = ''            # appended to the local CSV snapshot names, one per session
+        self.stateFile = stateFile
+        self.lastState = self.loadState()
 
         # Establishing Connection to the API Server
-        self.ixNet = IxNetwork.IxNet()
+        self.ixNet = IxNetProxy(IxNetwork.IxNet(), "{}:{}".format(vmip, apiPort))
 
         CaptureThat.debug("connecting to IxNetwork client")
         self.ixNet.connect(self.IXIA_VM_IP, '-port', self.IXIA_ServerPort, '-version', self.CHASSIS_IXIA_VERSION, '-setAttribute', 'strict')
@@ -85,76 +932,372 @@ class IxiaConnector:
         CaptureThat.info("Connected to IxNetwork client {} - {}".format(self.CHASSIS_DNS,self.IXIA_VM_IP))
         CaptureThat.info("Ixia Version {} running on the script".format(self.CHASSIS_IXIA_VERSION))
         print("Unable to Connect to IXIA-Network-VM. Ensure the API Server software is running and Try again")
+        if self.lastState is not None:
+            CaptureThat.info("RECONFIG: Keeping the running configuration recorded in {}".format(self.stateFile))
+            return
         try:
             # Cleaning up IxNetwork
             CaptureThat.debug("Cleaning up IxNetwork...")
             self.ixNet.execute('newConfig')
+            self.handleCache.clear()
         except:
             print("Unable to create a New Configuration. Please make sure there is no Active Configuration running on the VM")
             CaptureThat.fatal("Unable to create a New Configuration. Please make sure there is no Active Configuration running on the VM")
 
-    def ConnectPhysicalPorts(self, listofPorts):
-        # Assign real ports
-        for every in listofPorts:
-            self.__assignPort__(every)
-        time.sleep(5)
+    @apiStage('port assign')
+    def ConnectPhysicalPorts(self, listofPorts, timeout=PORT_LINKUP_TIMEOUT):
+        # Queue every Chassis (once per chassis), VirtualPort and Topology and create them in a single commit
+        knownChassis = set(self.ChassisObjs)
+        queued = [self.__assignPort__(every) for every in listofPorts]
+        newChassis = [chassis for chassis in self.ChassisObjs if chassis not in knownChassis]
+        self.ixNet.commit()
+
+        tempHandles = [self.ChassisObjs[chassis] for chassis in newChassis]
+        for entry in queued:
+            tempHandles.extend([entry['vport'], entry['topology']])
+        handles = self.ixNet.remapIds(tempHandles) if tempHandles else []
+        for chassis, handle in zip(newChassis, handles):
+            self.ChassisObjs[chassis] = handle
+            print(handle)
+        handles = handles[len(newChassis):]
+
+        # ---------------   Linking every Physical Port to its VirtualPort Object in one commit -------------------------
+        vportNames = {}
+        for index, entry in enumerate(queued):
+            vport, topo = handles[2 * index], handles[2 * index + 1]
+            self.ToplgyperPort[vport] = entry['topologyInfo']  # ------> Key Element of the Code. Topology Tree attached to virtual ports
+            self.TopologyperVport[vport] = topo
+            self.vPortList.append(vport)
+            vportNames[vport] = entry['name']
+            self.TopologyNames[entry['name']] = topo
+            self.HandleMap[entry['name']] = topo
+            self.ixNet.setAttribute(topo, '-vports', vport)
+            cardPortRef1 = self.ChassisObjs[entry['chassis']] + '/card:%s/port:%s' % (entry['card'], entry['port'])
+            self.ixNet.setMultiAttribute(vport, '-connectedTo', cardPortRef1, '-rxMode', 'captureAndMeasure', '-name', entry['name'])
+        self.ixNet.commit()
+        self.PortTuples.extend(listofPorts)
+        CaptureThat.info("PORT_ASSIGN: Connected {} ports on {} chassis".format(len(queued), len(self.ChassisObjs)))
+        return self.__waitForPorts__(vportNames, timeout)
 
     def __assignPort__(self, data):
         # Extracting the Independent Components from the Tuple
-        # print(realPort)
         chassis1 = data[0]
         card1 = data[1]
         port1 = data[2]
         name = data[3]
         topologyInfo = data[4]
 
-        # ------------------    Creating VirtualPort Object ------------------------
-        vport = self.ixNet.add(self.root, 'vport')
-        self.ixNet.commit()
-        vport = self.ixNet.remapIds(vport)[0]
-        self.ToplgyperPort[vport] = topologyInfo  # ------> Key Element of the Code. Topology Tree attached to virtual ports
+        # --------------------- Creating a Chassis Object (only once per Chassis)  -----------------------------
+        if chassis1 not in self.ChassisObjs:
+            chassisObj1 = self.ixNet.add(self.root + '/availableHardware', 'chassis')
+            self.ixNet.setAttribute(chassisObj1, '-hostname', chassis1)
+            self.ChassisObjs[chassis1] = chassisObj1
 
-        # Adding Topologies
+        # ------------------    Creating VirtualPort Object and its Topology ------------------------
+        vport = self.ixNet.add(self.root, 'vport')
         topo = self.ixNet.add(self.root, 'topology')
-        self.ixNet.commit()
-        self.ixNet.setAttribute(topo, '-vports', vport)
+        return {'chassis': chassis1, 'card': card1, 'port': port1, 'name': name,
+                'topologyInfo': topologyInfo, 'vport': vport, 'topology': topo}
 
-        # --------------------- Creating a Chassis Object   -----------------------------
-        chassisObj1 = self.ixNet.add(self.root + '/availableHardware', 'chassis')
-        self.ixNet.setAttribute(chassisObj1, '-hostname', chassis1)
-        self.ixNet.commit()
-        chassisObj1 = self.ixNet.remapIds(chassisObj1)[0]
-        print(chassisObj1)
+    # Poll every vport until it is connected and its link is up, recording the time each one took
+    def __waitForPorts__(self, vportNames, timeout):
+        start = time.time()
+        waiting = dict(vportNames)
 
-        # ---------------   Linking the Physical Port to the VirtualPort Object -------------------------
-        cardPortRef1 = chassisObj1 + '/card:%s/port:%s' % (card1, port1)
-        self.ixNet.setMultiAttribute(vport, '-connectedTo', cardPortRef1, '-rxMode', 'captureAndMeasure', '-name', name)
-        self.ixNet.commit()
+        def portsUp():
+            for vport in list(waiting):
+                if self.ixNet.getAttribute(vport, '-isConnected') == 'true' and self.ixNet.getAttribute(vport, '-state') == 'up':
+                    self.PortLinkUpTime[waiting.pop(vport)] = round(time.time() - start, 2)
+            return not waiting
+
+        self.waiter.waitUntil('ports', portsUp, timeout, PORT_POLL_INTERVAL, PORT_POLL_INTERVAL)
+        for name, elapsed in sorted(self.PortLinkUpTime.items(), key=lambda item: -item[1]):
+            CaptureThat.info("PORT_LINKUP: {} up after {}s".format(name, elapsed))
+        for vport, name in waiting.items():
+            print("Port {} did not come up within {}s".format(name, timeout))
+            CaptureThat.warning("PORT_LINKUP_TIMEOUT: {} ({}) did not come up within {}s".format(name, vport, timeout))
+        return self.PortLinkUpTime
+
+    # Another connection to the same API Server session, e.g. one per statistics worker thread.
+    # Nothing is reset on it: it sees the configuration built through self.ixNet
+    def newConnection(self):
+        ixNet = IxNetProxy(IxNetwork.IxNet(), "{}:{} stats-{}".format(self.IXIA_VM_IP, self.IXIA_ServerPort, len(self.statConnections) + 1))
+        ixNet.connect(self.IXIA_VM_IP, '-port', self.IXIA_ServerPort, '-version', self.CHASSIS_IXIA_VERSION, '-setAttribute', 'strict')
+        self.statConnections.append(ixNet)
+        CaptureThat.debug("STATS_CONNECT: Opened {}".format(ixNet.name))
+        return ixNet
+
+    # The session's IxiaStatCollector: its worker connections are reused by every collection until closeStatConnections()
+    def statisticsCollector(self):
+        if self.statCollector is None:
+            self.statCollector = IxiaStatCollector(self)
+        return self.statCollector
+
+    def closeStatConnections(self):
+        if self.statCollector is not None:
+            self.statCollector.close()
+            self.statCollector = None
 
     def getVPorts(self):
         return self.ixNet.getList(self.root, 'vport')
 
+    def getMultivalue(self, handle, attr):
+        return self.handleCache.getMultivalue(self.ixNet, handle, attr)
+
+    def __recordProtocol__(self, handle):
+        if handle.rsplit('/', 1)[-1].split(':')[0] in SESSION_STATUS_TYPES:
+            self.ProtocolList.append(handle)
+
+    def removeObject(self, handle):
+        self.ixNet.remove(handle)
+        self.ixNet.commit()
+        self.handleCache.invalidate(handle)
+        self.ProtocolList = [proto for proto in self.ProtocolList if proto != handle and not proto.startswith(handle + '/')]
+        CaptureThat.debug("OBJ_REMOVE: Removed {} and its cached handles".format(handle))
+
     # Set Scenarios for the Ports added in the Scenario
+    @apiStage('scenario build')
     def setScenarios(self):
         self.deviceGroup = []
+        roundTripsBefore = self.ixNet.roundTrips()
+        if self.batchMode:
+            self.__setScenariosBatched__()
+        else:
+            self.__setScenariosLegacy__()
+        roundTrips = self.ixNet.roundTrips() - roundTripsBefore
+        print("Scenario build took {} API round trips (batchMode={})".format(roundTrips, self.batchMode))
+        CaptureThat.info("CONFIG_ROUNDTRIPS: {} API round trips (batchMode={}) -> {}".format(roundTrips, self.batchMode, self.ixNet.report()))
+        CaptureThat.info("HANDLE_CACHE: {}".format(self.handleCache.report()))
 
-        topoList = self.ixNet.getList(self.root, 'topology')
+    # Index every vport to its topology. Topologies created by __assignPort__ are already indexed,
+    # the rest are resolved with one '-vports' lookup per topology instead of one per (port, topology)
+    def buildVportIndex(self):
+        if all(vport in self.TopologyperVport for vport in self.ToplgyperPort):
+            return self.TopologyperVport
+        for topo in self.ixNet.getList(self.root, 'topology'):
+            for vport in self.ixNet.getAttribute(topo, '-vports'):
+                self.TopologyperVport[vport] = topo
+        CaptureThat.debug("VPORT_INDEX: Indexed {} vports to their topologies".format(len(self.TopologyperVport)))
+        return self.TopologyperVport
+
+    def __setScenariosLegacy__(self):
+        vportIndex = self.buildVportIndex()
         for key,value in self.ToplgyperPort.items():
-            for i in topoList:
-                if self.ixNet.getAttribute(i,'-vports')[0] == key:
-                    CaptureThat.debug("VPORT_MATCH: Topology for specific vPort Found!!")
-                    CaptureThat.debug("Preparing to Configure Device Groups")
-                    topoInfo = self.ToplgyperPort[key]['deviceGroup']
-                    topoPointer = i
-                    break
-
-            self.ixNet.add(topoPointer, 'deviceGroup')                  # Add Device-Groups to Topology
-            self.ixNet.commit()                                         # Commit the Changes
-            dg1 = self.ixNet.getList(topoPointer, 'deviceGroup')[0]     # Select the First device-Group (NOTE: Currently ONLY ONE DEVICE-GROUP
-            print(topoInfo)                                             # is supported by the program. Will upgrade the code
-            self.treeBreakdown('deviceGroup/1',dg1,topoInfo[0])
+            topoPointer = vportIndex[key]
+            CaptureThat.debug("VPORT_MATCH: Topology {} for vPort {}".format(topoPointer, key))
+            print(value['deviceGroup'])
+            for index, topoInfo in enumerate(expandDeviceGroups(value)):   # Every Device-Group listed (or templated) for the Topology
+                dg = self.ixNet.add(topoPointer, 'deviceGroup')            # Add Device-Groups to Topology
+                self.ixNet.commit()                                        # Commit the Changes
+                dg = self.ixNet.remapIds(dg)[0]                            # Handle of the newly created Device-Group
+                self.deviceGroup.append(dg)
+                self.DeviceGroupNames[(value.get('name'), topoInfo.get('-name'))] = dg
+                dgPath = self.__dgPath__(value.get('name'), index, topoInfo)
+                self.HandleMap[dgPath] = dg
+                self.treeBreakdown(dg,dg,topoInfo,dgPath)
         CaptureThat.info("CONFIG_COMPLETE: Completed Configuring Scenarios")
 
+    # One topology at a time: its Device-Groups and child-objects are queued and committed together, then
+    # their attributes. With batchSize, the queued objects are also committed once batchSize of them are
+    # pending (checked after every Device-Group), so no commit grows with the size of the topology
+    def __setScenariosBatched__(self):
+        vportIndex = self.buildVportIndex()
+        for key,value in self.ToplgyperPort.items():
+            topoPointer = vportIndex[key]
+            pending = []
+            deviceGroups = []
+            for index, topoInfo in enumerate(expandDeviceGroups(value)):
+                dg = self.ixNet.add(topoPointer, 'deviceGroup')
+                deviceGroups.append((len(pending), (value.get('name'), topoInfo.get('-name'))))
+                pending.append((dg, topoInfo))
+                dgPath = self.__dgPath__(value.get('name'), index, topoInfo)
+                self.__pendingPaths__[dg] = dgPath
+                self.__queueChildObjects__(dg, topoInfo, pending, dgPath)
+                if self.batchSize and len(pending) >= self.batchSize:
+                    self.__commitQueued__(pending, deviceGroups)
+                    pending = []
+                    deviceGroups = []
+            self.__commitQueued__(pending, deviceGroups)
+        CaptureThat.info("CONFIG_COMPLETE: Completed Configuring Scenarios")
+
+    # Commit the queued (temporary handle, sub-tree) pairs, then queue and flush their attributes
+    def __commitQueued__(self, pending, deviceGroups):
+        if not pending:
+            return
+        self.ixNet.commit()
+        CaptureThat.debug("BATCH_CONFIG: Committed {} queued child-objects".format(len(pending)))
+
+        # Resolve all the newly created handles in one go instead of a getList(...)[0] per object
+        handles = self.ixNet.remapIds([tempHandle for tempHandle, subTree in pending])
+        self.__resolvePending__(pending, handles)
+        for index, names in deviceGroups:
+            self.deviceGroup.append(handles[index])
+            self.DeviceGroupNames[names] = handles[index]
+
+        for handle, (tempHandle, subTree) in zip(handles, pending):
+            self.__queueAttributes__(handle, subTree)
+        self.__flushBatch__()
+
+    ################################################################################
+    #               Incremental reconfiguration against the last run
+    ################################################################################
+    # Diffs "listofPorts" against the configuration recorded in the state file and applies only the
+    # added, removed and changed Device-Groups, child-objects and attributes. Returns False, after a
+    # newConfig, when there is no usable state or the ports/topologies changed: the caller then runs
+    # the full ConnectPhysicalPorts/setScenarios build.
+    @apiStage('reconfigure')
+    def reconfigure(self, listofPorts):
+        if self.lastState is None:
+            return False
+        newPorts = json.loads(json.dumps(listofPorts))          # Same shape as the ports read back from the state file
+        oldPorts = self.lastState['ports']
+        if [port[:4] for port in oldPorts] != [port[:4] for port in newPorts]:
+            return self.__fullRebuild__("the chassis/ports/topologies changed")
+        if sorted(self.ixNet.getList(self.root, 'topology')) != sorted(self.lastState['topologies'].values()):
+            return self.__fullRebuild__("the API Server no longer holds the recorded topologies")
+
+        self.__restoreState__(listofPorts)
+        if self.lastState['trafficItems']:
+            # Traffic Items are rebuilt from the YAML on every run
+            for ti in self.lastState['trafficItems']:
+                self.ixNet.remove(ti)
+            self.ixNet.commit()
+        if [port[4] for port in oldPorts] == [port[4] for port in newPorts]:
+            print("Reconfigure: no configuration change since the last run")
+            CaptureThat.info("RECONFIG: No configuration change since the last run")
+            return True
+
+        self.stopProtocols()
+        changes = 0
+        for old, new in zip(oldPorts, listofPorts):
+            changes += self.__diffDeviceGroups__(new[3], list(expandDeviceGroups(old[4])), list(expandDeviceGroups(new[4])))
+        self.__flushBatch__()
+        print("Reconfigure: applied {} changes".format(changes))
+        CaptureThat.info("RECONFIG: Applied {} changes -> {}".format(changes, self.ixNet.report()))
+        return True
+
+    def __fullRebuild__(self, reason):
+        print("Reconfigure: full rebuild, {}".format(reason))
+        CaptureThat.warning("RECONFIG_REBUILD: Full rebuild, {}".format(reason))
+        self.lastState = None
+        self.ixNet.execute('newConfig')
+        self.handleCache.clear()
+        return False
+
+    def __restoreState__(self, listofPorts):
+        topologyInfo = {port[3]: port[4] for port in listofPorts}
+        self.PortTuples = list(listofPorts)
+        self.HandleMap = dict(self.lastState['handles'])
+        self.TopologyNames = dict(self.lastState['topologies'])
+        for vport, topoName in self.lastState['vports'].items():
+            self.vPortList.append(vport)
+            self.ToplgyperPort[vport] = topologyInfo[topoName]
+            self.TopologyperVport[vport] = self.TopologyNames[topoName]
+        for topoName, dgName, dg in self.lastState['deviceGroups']:
+            self.DeviceGroupNames[(topoName, dgName)] = dg
+            self.deviceGroup.append(dg)
+        for handle in self.HandleMap.values():
+            self.__recordProtocol__(handle)
+        for handle, attr, mv in self.lastState.get('multivalues', []):
+            self.handleCache.multivalues[(handle, attr)] = mv
+            self.ixNet.labelMultivalue(mv, handle, attr)
+
+    def __diffDeviceGroups__(self, topoName, oldGroups, newGroups):
+        oldPaths = {self.__dgPath__(topoName, index, topoInfo): topoInfo for index, topoInfo in enumerate(oldGroups)}
+        newPaths = [self.__dgPath__(topoName, index, topoInfo) for index, topoInfo in enumerate(newGroups)]
+        changes = 0
+        for dgPath in oldPaths:
+            if dgPath not in newPaths:
+                self.__removePath__(dgPath)
+                changes += 1
+        for dgPath, topoInfo in zip(newPaths, newGroups):
+            if dgPath in oldPaths:
+                changes += self.__diffTree__(self.HandleMap[dgPath], oldPaths[dgPath], topoInfo, dgPath)
+                continue
+            dg = self.ixNet.add(self.TopologyNames[topoName], 'deviceGroup')
+            self.ixNet.commit()
+            dg = self.ixNet.remapIds(dg)[0]
+            self.deviceGroup.append(dg)
+            self.DeviceGroupNames[(topoName, topoInfo.get('-name'))] = dg
+            self.HandleMap[dgPath] = dg
+            self.__buildTree__(dg, topoInfo, dgPath)
+            changes += 1
+        return changes
+
+    # Walk the old and new sub-trees of the object "handle" together. Changed attributes are queued and
+    # flushed once by reconfigure(); new child-objects are built, removed ones are deleted
+    def __diffTree__(self, handle, old, new, yamlPath):
+        changes = 0
+        changed = {}
+        for key, value in new.items():
+            if childObjectType(key):
+                if key not in old:
+                    self.__buildTree__(handle, {key: value}, yamlPath)
+                    changes += 1
+                elif value != old[key]:
+                    changes += self.__diffTree__(self.HandleMap[yamlPath + '/' + key], old[key], value, yamlPath + '/' + key)
+            elif '-' in key and value != old.get(key):
+                changed[key] = value
+        for key in old:
+            if key in new:
+                continue
+            if childObjectType(key):
+                self.__removePath__(yamlPath + '/' + key)
+                changes += 1
+            elif '-' in key:
+                CaptureThat.warning("RECONFIG: {} removed from {}, IxNetwork keeps its current value".format(key, yamlPath))
+        if changed:
+            CaptureThat.debug("RECONFIG: {} changed on {}".format(list(changed), yamlPath))
+            self.__queueAttributes__(handle, changed)
+            changes += len(changed)
+        return changes
+
+    def __buildTree__(self, Pointer, data, yamlPath):
+        if self.batchMode:
+            self.treeBreakdownBatched(Pointer, data, yamlPath)
+        else:
+            self.treeBreakdown(Pointer, Pointer, data, yamlPath)
+
+    def __removePath__(self, yamlPath):
+        handle = self.HandleMap[yamlPath]
+        self.removeObject(handle)
+        self.HandleMap = {path: value for path, value in self.HandleMap.items() if path != yamlPath and not path.startswith(yamlPath + '/')}
+        self.DeviceGroupNames = {names: dg for names, dg in self.DeviceGroupNames.items() if dg != handle}
+        self.deviceGroup = [dg for dg in self.deviceGroup if dg != handle]
+
+    ################################################################################
+    #               State file of the applied configuration
+    ################################################################################
+    def loadState(self):
+        if not self.stateFile or not os.path.exists(self.stateFile):
+            return None
+        try:
+            with open(self.stateFile) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            CaptureThat.warning("RECONFIG: Unreadable state file {}, doing a full build".format(self.stateFile))
+            return None
+
+    def saveState(self):
+        if not self.stateFile:
+            return
+        state = {'ports': self.PortTuples,
+                 'topologies': self.TopologyNames,
+                 'vports': {vport: topologyInfo['name'] for vport, topologyInfo in self.ToplgyperPort.items()},
+                 'deviceGroups': [[topoName, dgName, dg] for (topoName, dgName), dg in self.DeviceGroupNames.items()],
+                 'handles': self.HandleMap,
+                 'multivalues': [[handle, attr, mv] for (handle, attr), mv in self.handleCache.multivalues.items()],
+                 'trafficItems': self.TrafficItems}
+        with open(self.stateFile + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.stateFile + '.tmp', self.stateFile)
+        CaptureThat.info("RECONFIG: Recorded {} handles in {}".format(len(self.HandleMap), self.stateFile))
+
+    # A half-applied configuration cannot be diffed against: the next run does a full build
+    def clearState(self):
+        if self.stateFile and os.path.exists(self.stateFile):
+            os.remove(self.stateFile)
+
     '''
     ########################################################################
     #                       HEART OF THE PROGRAM                           #
@@ -165,10 +1308,9 @@ class IxiaConnector:
     #   IF THE PARSING FAILS, MAKE SURE THE YAML IS PROPERLY CREATED       #
     # ---------------------------------------------------------------------#
     #   NOTE:                                                              # 
-    #   *   FOR EVERY ITERABLE OBJECT IN IXIA-API, INCLUDE "/1" AFTER THE  #
-    #   VARIABLE DEFINTION. FOR EXAMPLE, FOR MULTIPLE DEVICE-GROUP DEFIN-  #
-    #   -ITIONS, USE "deviceGroup/1", instead of "deviceGroup. This will   #
-    #   will be rectified in future updates. Contributions are welcome :)  #
+    #   *   FOR EVERY ITERABLE OBJECT IN IXIA-API, INCLUDE "/N" AFTER THE  #
+    #   VARIABLE DEFINTION. FOR EXAMPLE, "ethernet/1" FOR THE FIRST ETHER- #
+    #   -NET STACK AND "ethernet/2" FOR A SECOND ONE UNDER THE SAME OBJECT #
     #                                                                      #
     #   *  IN ADDITION, CERTAIN VARIABLES ARE NOT HANDLED DUE TO RECURSIVE #
     #   CALL, ADD THEM TO "SPECIAL_ATTR_LIST" LIST PRESENT IN THE START    #
@@ -176,7 +1318,7 @@ class IxiaConnector:
     #                                                                      #
     ########################################################################
     '''
-    def treeBreakdown(self,Parent,Pointer,data):
+    def treeBreakdown(self,Parent,Pointer,data,yamlPath=None):
         newPtr = Pointer
         CaptureThat.debug("")
         CaptureThat.debug("#"*125)
@@ -186,17 +1328,19 @@ class IxiaConnector:
         for key,value in data.items():
 
             #Catch the Iterable Objects from the YAML file
-            if "/1" in key:
+            if childObjectType(key):
                 CaptureThat.debug("---------------------------CHILD-OBJECT-CONFIG------------------------------------")
                 CaptureThat.debug("\tParent ---> {}".format(Parent))
                 CaptureThat.debug("\tKey ---> {}".format(key))
                 CaptureThat.debug("\tPointer ---> {}".format(newPtr))
 
-                actualKey = key.replace("/1", "")
+                actualKey = childObjectType(key)
                 d_ptr = self.ixNet.add(newPtr, actualKey)           # Add the Child-Object to Ixia-Device-Group tree Structure
                 self.ixNet.commit()                                 # Commit the Changes
-                newPtr = self.ixNet.getList(Pointer, actualKey)[0]  # Extract the Pointer for newly created child-object
-                self.treeBreakdown(newPtr,newPtr,value)             # Perform a Recursive Call by Passing Child Objects and the sub-tree structure
+                newPtr = self.ixNet.remapIds(d_ptr)[0]              # Extract the Pointer for newly created child-object
+                self.__recordProtocol__(newPtr)
+                childPath = self.__recordPath__(yamlPath, key, newPtr)
+                self.treeBreakdown(newPtr,newPtr,value,childPath)   # Perform a Recursive Call by Passing Child Objects and the sub-tree structure
                 self.ixNet.commit()                                 # Once Completed, Perform the final Commit
 
             #Catch the Attribute type Variables
@@ -209,12 +1353,72 @@ class IxiaConnector:
                 if key in SPECIAL_ATTR_LIST:                        # CAN BE MODIFIED FOR FUTURE USE, WITH RESPECT TO CONNECTOR LINK OPTIMIZATION
                     self.setMultiAttr(Pointer, key, value)
                 else:                                               # The normal case will fall into this category
-                    treepath = self.ixNet.getAttribute(Parent, key)
+                    treepath = self.getMultivalue(Parent, key)
                     CaptureThat.debug("\tTreePath ---> {}".format(treepath))
                     self.setMultiAttr(treepath,key,value)
                 self.ixNet.commit()
             newPtr = Pointer                                        # After every lookup, we re-define the Pointer
 
+    
+    def treeBreakdownBatched(self,Pointer,data,yamlPath=None):
+        pending = []
+        self.__queueChildObjects__(Pointer, data, pending, yamlPath)
+        self.ixNet.commit()
+        handles = self.ixNet.remapIds([tempHandle for tempHandle, subTree in pending]) if pending else []
+        self.__resolvePending__(pending, handles)
+        self.__queueAttributes__(Pointer, data)
+        for handle, (tempHandle, subTree) in zip(handles, pending):
+            self.__queueAttributes__(handle, subTree)
+        self.__flushBatch__()
+
+    def __queueChildObjects__(self, Pointer, data, pending, yamlPath=None):
+        # Depth-first, so that a child is always queued after its parent
+        for key,value in data.items():
+            actualKey = childObjectType(key)
+            if actualKey:
+                d_ptr = self.ixNet.add(Pointer, actualKey)
+                CaptureThat.debug("BATCH_CONFIG: Queued child-object {} under {}".format(actualKey, Pointer))
+                pending.append((d_ptr, value))
+                childPath = None if yamlPath is None else yamlPath + '/' + key
+                if childPath is not None:
+                    self.__pendingPaths__[d_ptr] = childPath
+                self.__queueChildObjects__(d_ptr, value, pending, childPath)
+
+    # Record the handles returned by remapIds for the queued (temporary handle, sub-tree) pairs
+    def __resolvePending__(self, pending, handles):
+        for handle, (tempHandle, subTree) in zip(handles, pending):
+            self.__recordProtocol__(handle)
+            if tempHandle in self.__pendingPaths__:
+                self.HandleMap[self.__pendingPaths__.pop(tempHandle)] = handle
+
+    def __recordPath__(self, yamlPath, key, handle):
+        if yamlPath is None:
+            return None
+        self.HandleMap[yamlPath + '/' + key] = handle
+        return yamlPath + '/' + key
+
+    # Device-Groups are a list in the YAML: they are identified by their -name, else by their position
+    @staticmethod
+    def __dgPath__(topoName, index, topoInfo):
+        return "{}/{}".format(topoName, topoInfo.get('-name') or 'deviceGroup:{}'.format(index + 1))
+
+    def __queueAttributes__(self, Pointer, data):
+        for key,value in data.items():
+            if not childObjectType(key) and '-' in key:
+                if key in SPECIAL_ATTR_LIST:
+                    self.__batchQueue__.append((Pointer, key, value))
+                else:
+                    treepath = self.getMultivalue(Pointer, key)
+                    self.__batchQueue__.append((treepath, key, value))
+                if self.batchSize and len(self.__batchQueue__) >= self.batchSize:
+                    self.__flushBatch__()
+
+    def __flushBatch__(self):
+        for treePath, key, value in self.__batchQueue__:
+            self.setMultiAttr(treePath, key, value)
+        CaptureThat.debug("BATCH_CONFIG: Committing {} queued attributes".format(len(self.__batchQueue__)))
+        self.__batchQueue__ = []
+        self.ixNet.commit()
 
     def setMultiAttr(self,treePath, key, dataPtr, deviceGroup=None):
         CaptureThat.debug("\tATTR_CONFIG: Attribute ---> {}".format(key))
@@ -256,18 +1460,29 @@ class IxiaConnector:
     ################################################################################
     #                              Start All Protocols
     ################################################################################
-    def startProtocols(self):
+    @apiStage('protocol start')
+    def startProtocols(self, timeout=WAIT_TIMEOUTS['protocols']):
         print("Starting all Protocols")
         CaptureThat.info("-------------------------- STARTING PROTOCOLS -----------------------------------")
         self.ixNet.execute('startAllProtocols')
         CaptureThat.info("Starting All Protocols")
-        print("Sleeping 30 seconds for Protocols to start")
-        CaptureThat.debug("Sleep 30sec for protocols to start")
-        time.sleep(30)
+        print("Waiting for Topologies to start and Sessions to come up")
+        return self.waiter.waitUntil('protocols', self.__protocolsUp__, timeout)
+
+    # Every topology started and every session (OSPF adjacency, ARP/gateway resolution, ...) up
+    def __protocolsUp__(self):
+        for topo in self.TopologyperVport.values():
+            if self.ixNet.getAttribute(topo, '-status') != 'started':
+                return False
+        for proto in self.ProtocolList:
+            if any(status != 'up' for status in self.ixNet.getAttribute(proto, '-sessionStatus')):
+                return False
+        return True
 
     ################################################################################
     #                               Stop all protocols
     ################################################################################
+    @apiStage('protocol stop')
     def stopProtocols(self):
         CaptureThat.info("vvvvvvvvvvvvvvvvvvvvvvvvvv STOP PROTOCOL vvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv")
         print("Stopping all Protocols")
@@ -278,147 +1493,702 @@ class IxiaConnector:
     #                           Configure L2-L3 traffic
     ################################################################################
     def createTraffic(self,Name,source,destination,PktSize = 1500,PercentLineRate = 10,PktCount = 1000000):
-        CaptureThat.debug("Configuring L2-L3 Traffic Item")
-        print("Configuring L2-L3 Traffic Item")
-        ti1 = self.ixNet.add(self.ixNet.getRoot() + '/traffic', 'trafficItem')
-
-        self.ixNet.setMultiAttribute(ti1,
-                                     '-name', 'Traffic IPv4',
-                                     '-trafficType', 'ipv4',
-                                     '-allowSelfDestined', False,
-                                     '-trafficItemType', 'l2L3',
-                                     '-mergeDestinations', True,
-                                     '-egressEnabled', False,
-                                     '-srcDestMesh', 'manyToMany',
-                                     '-enabled', True,
-                                     '-routeMesh', 'fullMesh',
-                                     '-transmitMode', 'interleaved',
-                                     '-biDirectional', True,
-                                     '-hostsPerNetwork', 1)
-        self.ixNet.commit()
-        self.ixNet.setAttribute(ti1, '-trafficType', 'ipv4')
-        self.ixNet.commit()
-        self.ixNet.add(ti1, 'endpointSet',
-                  '-name', Name,                                                # Function Argument-1
-                  '-sources', source,                                           # Function Argument-2
-                  '-destinations', destination,                                 # Function Argument-3
-                  '-sourceFilter', '',
-                  '-destinationFilter', '')
+        return self.createTrafficItems([{'name': Name,
+                                         'endpoints': [{'name': Name,                   # Function Argument-1
+                                                        'sources': source,              # Function Argument-2
+                                                        'destinations': destination}],  # Function Argument-3
+                                         'frameSize': PktSize,                          # Function Argument-4
+                                         'percentLineRate': PercentLineRate,            # Function Argument-5
+                                         'frameCount': PktCount}])[0]                   # Function Argument-6
+
+    ################################################################################
+    #               Bulk L2-L3 traffic from the YAML "traffic" section
+    ################################################################################
+    # Every Traffic Item and its Endpoint-Sets are created in one commit and resolved with one remapIds.
+    # The frame size/rate/transmission settings of all of them go in a second commit. Returns the list
+    # of Traffic Items, which StartTraffic generates and applies in a single call.
+    @apiStage('traffic')
+    def createTrafficItems(self, trafficList):
+        CaptureThat.debug("Configuring {} L2-L3 Traffic Items".format(len(trafficList)))
+        print("Configuring {} L2-L3 Traffic Items".format(len(trafficList)))
+        trafficObj = self.ixNet.getRoot() + '/traffic'
+        tempHandles = []
+        for every in trafficList:
+            attributes = dict(TRAFFIC_ITEM_DEFAULTS)
+            attributes.update({key: value for key, value in every.items() if key.startswith('-')})
+            attributes['-name'] = every['name']
+            if 'trafficType' in every:
+                attributes['-trafficType'] = every['trafficType']
+            if 'biDirectional' in every:
+                attributes['-biDirectional'] = every['biDirectional']
+            ti = self.ixNet.add(trafficObj, 'trafficItem', *[item for pair in attributes.items() for item in pair])
+            for endpoint in every['endpoints']:
+                self.ixNet.add(ti, 'endpointSet',
+                               '-name', endpoint.get('name', every['name']),
+                               '-sources', [self.resolveEndpoint(src, attributes['-trafficType']) for src in endpoint['sources']],
+                               '-destinations', [self.resolveEndpoint(dst, attributes['-trafficType']) for dst in endpoint['destinations']],
+                               '-sourceFilter', '',
+                               '-destinationFilter', '')
+            tempHandles.append(ti)
         self.ixNet.commit()
-        self.ixNet.setMultiAttribute(ti1 + "/configElement:1/frameSize",
-                                '-type', 'fixed',
-                                '-fixedSize', PktSize)                          # Function Argument-4
-        self.ixNet.setMultiAttribute(ti1 + "/configElement:1/frameRate",
-                                '-type', 'percentLineRate',
-                                '-rate', PercentLineRate)                       # Function Argument-5
-        self.ixNet.setMultiAttribute(ti1 + "/configElement:1/transmissionControl",
-                                '-duration', 1,
-                                '-iterationCount', 1,
-                                '-startDelayUnits', 'bytes',
-                                '-minGapBytes', 12,
-                                '-frameCount', PktCount,                        # Function Argument-6
-                                '-type', 'fixedFrameCount',
-                                '-interBurstGapUnits', 'nanoseconds',
-                                '-interBurstGap', 0,
-                                '-enableInterBurstGap', False,
-                                '-interStreamGap', 0,
-                                '-repeatBurst', 1,
-                                '-enableInterStreamGap', False,
-                                '-startDelay', 0,
-                                '-burstPacketCount', 1, )
-        self.ixNet.setMultiAttribute(ti1 + "/tracking", '-trackBy', ['sourceDestValuePair0'])
+        trafficItems = self.ixNet.remapIds(tempHandles) if tempHandles else []
+
+        for ti, every in zip(trafficItems, trafficList):
+            # One configElement per Endpoint-Set, in the order of "endpoints". An Endpoint-Set may override
+            # the frameSize/percentLineRate/frameCount of its Traffic Item
+            self.ConfigElements[ti] = []
+            for position, endpoint in enumerate(every['endpoints'], 1):
+                configElement = "{}/configElement:{}".format(ti, position)
+                self.ConfigElements[ti].append(configElement)
+                self.ixNet.setMultiAttribute(configElement + "/frameSize",
+                                        '-type', 'fixed',
+                                        '-fixedSize', endpoint.get('frameSize', every.get('frameSize', 1500)))
+                self.ixNet.setMultiAttribute(configElement + "/frameRate",
+                                        '-type', 'percentLineRate',
+                                        '-rate', endpoint.get('percentLineRate', every.get('percentLineRate', 10)))
+                self.ixNet.setMultiAttribute(configElement + "/transmissionControl",
+                                        '-duration', 1,
+                                        '-iterationCount', 1,
+                                        '-startDelayUnits', 'bytes',
+                                        '-minGapBytes', 12,
+                                        '-frameCount', endpoint.get('frameCount', every.get('frameCount', 1000000)),
+                                        '-type', 'fixedFrameCount',
+                                        '-interBurstGapUnits', 'nanoseconds',
+                                        '-interBurstGap', 0,
+                                        '-enableInterBurstGap', False,
+                                        '-interStreamGap', 0,
+                                        '-repeatBurst', 1,
+                                        '-enableInterStreamGap', False,
+                                        '-startDelay', 0,
+                                        '-burstPacketCount', 1, )
+            self.ixNet.setMultiAttribute(ti + "/tracking", '-trackBy', every.get('trackBy', ['sourceDestValuePair0']))
         self.ixNet.commit()
-        return ti1
+        self.TrafficItems.extend(trafficItems)
+        CaptureThat.info("TRAFFIC_CONFIG: Created {} Traffic Items".format(len(trafficItems)))
+        return trafficItems
+
+    # "Topology1/NormalIPv4_1" or "Topology1/NormalIPv4_1/ethernet:1/ipv4:1" -> ixNet handle. ixNet handles pass through
+    def resolveEndpoint(self, endpoint, trafficType='ipv4'):
+        if endpoint.startswith('::ixNet::'):
+            return endpoint
+        parts = endpoint.split('/', 2)
+        if len(parts) < 2 or (parts[0], parts[1]) not in self.DeviceGroupNames:
+            raise KeyError("Traffic endpoint {} does not match any Topology/DeviceGroup".format(endpoint))
+        stack = parts[2] if len(parts) == 3 else TRAFFIC_ENDPOINT_STACK.get(trafficType, '')
+        return self.DeviceGroupNames[(parts[0], parts[1])] + ('/' + stack if stack else '')
 
     ################################################################################
     #                                   start traffic
     ################################################################################
+    # "TrafficItem" is one Traffic Item or a list of them, generated together in one call. A short
+    # fixedFrameCount run can be over before the first poll: 'stopped' then counts as started once the
+    # Traffic Items report Tx frames (the statistics are cleared before the start), never before
+    @apiStage('traffic')
     def StartTraffic(self,TrafficItem):
         CaptureThat.debug("Starting L2/L3 Traffic")
         r = self.ixNet.getRoot()
+        trafficObj = r + '/traffic'
         self.ixNet.execute('generate', TrafficItem)
-        self.ixNet.execute('apply', r + '/traffic')
-        self.ixNet.execute('start', r + '/traffic')
-        time.sleep(15)
+        self.ixNet.execute('apply', trafficObj)
+        self.ixNet.execute('clearStats')
+        self.ixNet.execute('start', trafficObj)
+
+        def runningOrRan():
+            state = self.ixNet.getAttribute(trafficObj, '-state')
+            return state.startswith('started') or (state == 'stopped' and self.__txFrames__() > 0)
+        return self.waiter.waitUntil('traffic started', runningOrRan, WAIT_TIMEOUTS['trafficStarted'])
+
+    # Tx frames of every Traffic Item since the last clearStats, 0 while the view cannot be read
+    def __txFrames__(self):
+        try:
+            statcap, statRows = viewRows(self.ixNet, 'Traffic Item Statistics')
+            column = statcap.index('Tx Frames')
+            return sum(float(row[column] or 0) for row in statRows)
+        except Exception:
+            CaptureThat.debug("TRAFFIC_TX: Traffic Item Statistics not readable yet")
+            return 0
 
     ################################################################################
     #                               Stop L2/L3 traffic
     ################################################################################
+    @apiStage('traffic')
     def StopTraffic(self):
         CaptureThat.debug('Stopping L2/L3 traffic')
         self.ixNet.execute('stop', self.ixNet.getRoot() + '/traffic')
-        time.sleep(5)
+        return self.waitForTraffic('stopped', WAIT_TIMEOUTS['trafficStopped'])
+
+    ################################################################################
+    #               Change the configElement of existing Traffic Items
+    ################################################################################
+    # Only the values given are set, on every configElement (one per Endpoint-Set) of every Traffic Item
+    # in "trafficItems", in a single commit. The topology and the Traffic Items stay as they are;
+    # StartTraffic regenerates and applies them.
+    @apiStage('traffic')
+    def setTrafficParameters(self, trafficItems, frameSize=None, percentLineRate=None, frameCount=None):
+        for ti in trafficItems:
+            for configElement in self.ConfigElements.get(ti) or [ti + "/configElement:1"]:
+                if frameSize is not None:
+                    self.ixNet.setMultiAttribute(configElement + "/frameSize", '-type', 'fixed', '-fixedSize', frameSize)
+                if percentLineRate is not None:
+                    self.ixNet.setMultiAttribute(configElement + "/frameRate", '-type', 'percentLineRate', '-rate', percentLineRate)
+                if frameCount is not None:
+                    self.ixNet.setMultiAttribute(configElement + "/transmissionControl", '-type', 'fixedFrameCount', '-frameCount', frameCount)
+        self.ixNet.commit()
+        CaptureThat.debug("TRAFFIC_PARAMS: frameSize={} rate={} frameCount={} on {} Traffic Items".format(frameSize, percentLineRate,
+                                                                                                          frameCount, len(trafficItems)))
+
+    # One fixedFrameCount trial: one generate/apply/start, wait for the traffic to stop on its own, then the Flow Statistics.
+    # A trial shorter than a poll interval is already 'stopped' when StartTraffic returns, and no wait runs to its timeout
+    def runTrafficTrial(self, trafficItems, timeout=WAIT_TIMEOUTS['trafficRun'], snapshot=False):
+        self.StartTraffic(trafficItems)
+        self.waitForTraffic('stopped', timeout)
+        self.StopTraffic()
+        return self.getTrafficStatistics(snapshot=snapshot)
+
+    ################################################################################
+    #               Wait for the traffic to reach a state
+    ################################################################################
+    @apiStage('traffic')
+    def waitForTraffic(self, state, timeout):
+        trafficObj = self.ixNet.getRoot() + '/traffic'
+        return self.waiter.waitUntil('traffic ' + state, lambda: self.ixNet.getAttribute(trafficObj, '-state') == state, timeout)
 
     ###############################################################################
     #               Retrieve L2/L3 traffic item statistics
     ###############################################################################
-    def getTrafficStatistics(self):
-        Stat_Table = PrettyTable()
+    # With "snapshot", the API Server writes the view to CSV and the file is parsed locally instead of
+    # pulling '-rowValues' through the API (use it for very large flow views)
+    @apiStage('stats')
+    def getTrafficStatistics(self, columns=TRAFFIC_STATS, snapshot=False):
         CaptureThat.debug('Verifying all the L2-L3 traffic stats')
         viewPage = '::ixNet::OBJ-/statistics/view:"Flow Statistics"/page'
-        statcap = self.ixNet.getAttribute(viewPage, '-columnCaptions')
-        #Custom Table for Items. Edit the TRAFFIC_STATS list to modify the output
-        Stat_Table.field_names = TRAFFIC_STATS
+        self.waiter.waitUntil('statsView', lambda: self.ixNet.getAttribute(viewPage, '-isReady') == 'true', WAIT_TIMEOUTS['statsView'])
         CaptureThat.debug("Extracting Statistics from the executed Traffic Item")
-        for statValList in self.ixNet.getAttribute(viewPage, '-rowValues'):
-            rowData = []
-            for statVal in statValList:
-                index = 0
-                for satIndv in statVal:
-                    #CherryPicking Process
-                    if statcap[index] in TRAFFIC_STATS:
-                        rowData.append(satIndv)
-                    index = index + 1
-            # Add the Row Details
-            Stat_Table.add_row(rowData)
+        #Custom Table for Items. Edit the TRAFFIC_STATS list to modify the output
+        if snapshot:
+            statFrame = IxiaCsvSnapshot(self.takeViewSnapshot('Flow Statistics')).toFrame(columns)
+        else:
+            statcap, statRows = self.readViewRows('Flow Statistics')
+            statFrame = IxiaStatFrame(statcap, statRows, columns)
         #Print the results
+        Stat_Table = statFrame.toPrettyTable()
         print(Stat_Table)
         CaptureThat.debug("Completed Traffic Statistics")
         CaptureThat.debug("")
         CaptureThat.debug("")
         CaptureThat.info("\n"+str(Stat_Table))
+        return statFrame
+
+    ###############################################################################
+    #               Stream statistics while the traffic runs
+    ###############################################################################
+    # Polls every view in "views" each "interval" seconds and yields (timestamp, view, row) with
+    # the row as {caption: value}. Every page of the view is read, one page at a time, and each row
+    # is appended to "sink" (an IxiaStatSink) if given. Stops after "duration" seconds, or once the
+    # traffic has stopped when "untilTrafficStops" is set, or whenever the caller stops iterating.
+    def streamStatistics(self, views=STREAM_VIEWS, interval=STREAM_INTERVAL, duration=None, sink=None, untilTrafficStops=False):
+        trafficObj = self.ixNet.getRoot() + '/traffic'
+        start = time.time()
+        while True:
+            pollStart = time.time()
+            trafficStopped = untilTrafficStops and self.ixNet.getAttribute(trafficObj, '-state') == 'stopped'
+            for view in views:
+                timestamp = time.time()
+                for row in self.readViewPages(view):
+                    if sink:
+                        sink.write(timestamp, view, row)
+                    yield timestamp, view, row
+            if sink:
+                sink.flush()
+            if trafficStopped or (duration is not None and time.time() - start >= duration):
+                break
+            time.sleep(max(0, interval - (time.time() - pollStart)))
+
+    ###############################################################################
+    #               CSV snapshot of a statistic view
+    ###############################################################################
+    # Writes every page of "view" to CSV on the API Server and copies the file to SNAPSHOT_LOCAL_DIR,
+    # as "<view><snapshotSuffix>.csv" so that concurrent sessions never share a file
+    @apiStage('stats')
+    def takeViewSnapshot(self, view, localDir=SNAPSHOT_LOCAL_DIR):
+        settings = ['Snapshot.View.Contents: "allPages"',
+                    'Snapshot.View.Csv.Location: "{}"'.format(SNAPSHOT_REMOTE_DIR),
+                    'Snapshot.View.Csv.GeneratingMode: "kOverwriteCSVFile"',
+                    'Snapshot.View.Csv.StringQuotes: "True"',
+                    'Snapshot.View.Csv.SupportsCSVSorting: "False"',
+                    'Snapshot.View.Csv.FormatTimestamp: "True"',
+                    'Snapshot.View.Csv.DumpTxPortLabelMap: "False"',
+                    'Snapshot.View.Csv.DecimalPrecision: "3"',
+                    'Snapshot.Settings.Name: "{}"'.format(view)]
+        CaptureThat.debug("SNAPSHOT: Taking a CSV snapshot of the view {}".format(view))
+        self.ixNet.execute('TakeViewCSVSnapshot', [view], settings)
+        remotePath = SNAPSHOT_REMOTE_DIR + '\\' + view + '.csv'
+        localPath = os.path.join(localDir, view.replace(' ', '_') + self.snapshotSuffix + '.csv')
+        self.ixNet.execute('copyFile', self.ixNet.readFrom(remotePath, '-ixNetRelative'), self.ixNet.writeTo(localPath, '-overwrite'))
+        CaptureThat.info("SNAPSHOT: {} copied to {}".format(remotePath, localPath))
+        return localPath
+
+    # Generator over every row of every page of a statistic view as {caption: value}
+    def readViewPages(self, view):
+        statcap, statRows = self.readViewRows(view)
+        for statVal in statRows:
+            yield dict(zip(statcap, statVal))
+
+    # Column captions of a view and a generator over its raw rows, one page in memory at a time
+    def readViewRows(self, view):
+        return viewRows(self.ixNet, view)
+
+
+# Column captions of "view" and a generator over its raw rows, read through "ixNet" one page at a time
+def viewRows(ixNet, view):
+    viewPage = '::ixNet::OBJ-/statistics/view:"{}"/page'.format(view)
+    statcap = ixNet.getAttribute(viewPage, '-columnCaptions')
+    totalPages = int(ixNet.getAttribute(viewPage, '-totalPages'))
+
+    def pages():
+        for pageNumber in range(1, totalPages + 1):
+            if totalPages > 1:
+                ixNet.setAttribute(viewPage, '-currentPage', pageNumber)
+                ixNet.commit()
+            for statValList in ixNet.getAttribute(viewPage, '-rowValues'):
+                for statVal in statValList:
+                    yield statVal
+    return statcap, pages()
+
+
+################################################################################################
+#                                                                                              #
+#*_*_*_*_*_*_*_*_*_*_*_*_*_*_*   CLASS IxiaStatCollector    *_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*#
+#                                                                                              #
+#   Reads several statistic views at once, one view per worker thread. Every worker uses its   #
+#   own API Server connection (a low-level IxNet connection is not shared between threads),   #
+#   opened on first use and kept for the next collect() until close(). End-of-run collection  #
+#   then takes about as long as the slowest view instead of the sum of all of them.           #
+#   IxiaConnector.statisticsCollector() keeps one collector, and so its connections, per       #
+#   session; IxiaConnector.closeStatConnections() disconnects them.                            #
+#                                                                                              #
+#   Init Variables                                                                             #
+#       -> ixHandler: Connected IxiaConnector (its waiter and newConnection() are used)        #
+#       -> views: {view: columns} to read (default: STAT_VIEWS). None keeps every column       #
+#       -> maxWorkers: Views read at the same time (default: STAT_WORKERS)                     #
+#       -> connectionFactory: Callable returning a connected IxNetProxy                        #
+#                             (default: ixHandler.newConnection)                               #
+#                                                                                              #
+#   Public Functions:                                                                          #
+#       -> collect():        {view: IxiaStatFrame} of every view (or of "views") that could    #
+#                            be read                                                           #
+#       -> close():          Disconnect the worker connections                                 #
+#       -> join():           Snapshot joining the views per port and per Traffic Item          #
+#       -> snapshot():       collect() then join()                                             #
+#                                                                                              #
+################################################################################################
+class IxiaStatCollector:
+    def __init__(self, ixHandler, views=None, maxWorkers=STAT_WORKERS, connectionFactory=None):
+        self.ixHandler = ixHandler
+        self.views = dict(STAT_VIEWS if views is None else views)
+        self.maxWorkers = max(1, maxWorkers)
+        self.connectionFactory = connectionFactory or ixHandler.newConnection
+        self.idle = queue.Queue()           # connections not used by a worker right now
+        self.viewTimes = {}
+        self.errors = {}
+        self.wallTime = 0.0
 
+    def __read__(self, view, columns):
+        try:
+            ixNet = self.idle.get_nowait()
+        except queue.Empty:
+            ixNet = self.connectionFactory()
+        start = time.time()
+        try:
+            with ixNet.stage('stats'):
+                viewPage = '::ixNet::OBJ-/statistics/view:"{}"/page'.format(view)
+                self.ixHandler.waiter.waitUntil('statsView ' + view, lambda: ixNet.getAttribute(viewPage, '-isReady') == 'true',
+                                                WAIT_TIMEOUTS['statsView'])
+                statcap, statRows = viewRows(ixNet, view)
+                return IxiaStatFrame(statcap, statRows, statcap if columns is None else columns)
+        finally:
+            self.viewTimes[view] = round(time.time() - start, 3)
+            self.idle.put(ixNet)
+
+    def collect(self, views=None):
+        views = self.views if views is None else views
+        start = time.time()
+        frames = {}
+        self.viewTimes = {}
+        self.errors = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.maxWorkers, len(views))), thread_name_prefix='IxiaStats') as pool:
+            futures = {view: pool.submit(self.__read__, view, columns) for view, columns in views.items()}
+            for view, future in futures.items():
+                try:
+                    frames[view] = future.result()
+                except Exception as error:
+                    self.errors[view] = str(error)
+                    print("Unable to read the statistic view {}: {}".format(view, error))
+                    CaptureThat.warning("STATS_VIEW_FAIL: {}\n{}".format(view, traceback.format_exc()))
+        self.wallTime = round(time.time() - start, 3)
+        CaptureThat.info("STATS_COLLECT: {} views in {}s (sum of the views {}s) -> {}".format(
+            len(frames), self.wallTime, round(sum(self.viewTimes.values()), 3), self.viewTimes))
+        return frames
+
+    # The first view of a join is taken row by row when it has one row per key, every other view (and a
+    # first view with several rows per key) is aggregated per key (numeric columns only, see
+    # IxiaStatFrame.aggregate). A column already provided by an earlier view is suffixed with " (<view>)"
+    def join(self, frames):
+        snapshot = {'timestamp': time.time(), 'views': frames, 'viewTimes': dict(self.viewTimes), 'wallTime': self.wallTime,
+                    'errors': dict(self.errors)}
+        for joinName, sources in STAT_JOINS.items():
+            joined = {}
+            for position, (view, keyColumn) in enumerate(sources):
+                statFrame = frames.get(view)
+                if statFrame is None or keyColumn not in statFrame.columns or not len(statFrame):
+                    continue
+                keys = statFrame[keyColumn].astype(str)
+                if position == 0 and len(set(keys)) == len(keys):
+                    rows = {key: statFrame.row(index) for index, key in enumerate(keys)}
+                else:
+                    rows = statFrame.aggregate(keyColumn)
+                for key, row in rows.items():
+                    merged = joined.setdefault(key, {})
+                    for column, value in row.items():
+                        if column != keyColumn:
+                            merged[column if column not in merged else "{} ({})".format(column, view)] = value
+            snapshot[joinName] = joined
+        return snapshot
+
+    def snapshot(self):
+        return self.join(self.collect())
+
+    def close(self):
+        while True:
+            try:
+                ixNet = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                ixNet.disconnect()
+                CaptureThat.debug("STATS_CONNECT: Closed {}".format(ixNet.name))
+            except Exception as error:
+                CaptureThat.warning("STATS_CONNECT: Unable to close {}: {}".format(ixNet.name, error))
+
+    @staticmethod
+    def toPrettyTable(joined, keyCaption):
+        columns = []
+        for row in joined.values():
+            columns.extend(column for column in row if column not in columns)
+        Join_Table = prettytable.PrettyTable()
+        Join_Table.field_names = [keyCaption] + columns
+        for key, row in sorted(joined.items()):
+            Join_Table.add_row([key] + [round(row[column], 3) if isinstance(row.get(column), float) else row.get(column, '') for column in columns])
+        return Join_Table
+
+
+################################################################################################
+#                                                                                              #
+#*_*_*_*_*_*_*_*_*_*_*_*_*_*_*   CLASS IxiaSweepRunner    *_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*#
+#                                                                                              #
+#   Sweeps the frame size and rate of existing Traffic Items on one live IxiaConnector session.#
+#   The topology, the protocols and the Traffic Items stay up: every trial only changes the    #
+#   configElement (setTrafficParameters) and costs one generate/apply/start.                   #
+#                                                                                              #
+#   Init Variables                                                                             #
+#       -> ixHandler: Connected IxiaConnector with the protocols up                            #
+#       -> trafficItems: Traffic Items to sweep (all of them run in every trial)               #
+#       -> sweepConf: "sweep" section of the YAML. Missing keys come from SWEEP_DEFAULTS.      #
+#                     With "rfc2544: True" every frame size gets a zero-loss rate search,       #
+#                     otherwise every (frameSize, rate) pair of the matrix is run              #
+#                                                                                              #
+#   Public Functions:                                                                          #
+#       -> run():            Run the sweep described by sweepConf, return the trial results    #
+#       -> matrix():         One trial per (frame size, percent line rate) pair                #
+#       -> zeroLossRate():   RFC 2544 binary search of the highest rate without loss           #
+#       -> toPrettyTable():  Trials as a table                                                 #
+#                                                                                              #
+################################################################################################
+class IxiaSweepRunner:
+    def __init__(self, ixHandler, trafficItems, sweepConf=None):
+        self.ixHandler = ixHandler
+        self.trafficItems = trafficItems if isinstance(trafficItems, list) else [trafficItems]
+        self.conf = dict(SWEEP_DEFAULTS)
+        self.conf.update(sweepConf or {})
+        self.trials = []
+        self.zeroLoss = {}                  # frame size -> highest percent line rate without loss (None if none found)
+
+    def trial(self, frameSize, rate):
+        self.ixHandler.setTrafficParameters(self.trafficItems, frameSize, rate, self.conf['frameCount'])
+        statFrame = self.ixHandler.runTrafficTrial(self.trafficItems, snapshot=self.conf.get('statsSnapshot', False))
+        txFrames = float(numpy.nansum(statFrame['Tx Frames']))
+        rxFrames = float(numpy.nansum(statFrame['Rx Frames']))
+        loss = (txFrames - rxFrames) * 100.0 / txFrames if txFrames else 100.0
+        result = {'frameSize': frameSize, 'rate': rate, 'txFrames': txFrames, 'rxFrames': rxFrames, 'loss': round(loss, 6),
+                  'passed': loss <= self.conf['lossTolerance']}
+        self.trials.append(result)
+        CaptureThat.info("SWEEP_TRIAL: {}".format(result))
+        return result
+
+    def matrix(self, frameSizes=None, rates=None):
+        return [self.trial(frameSize, rate) for frameSize in frameSizes or self.conf['frameSizes'] for rate in rates or self.conf['rates']]
+
+    # Start at maxRate and halve the interval between the highest passing and the lowest failing
+    # rate until it is narrower than "resolution"
+    def zeroLossRate(self, frameSize):
+        low, high = 0.0, float(self.conf['maxRate'])
+        rate, best = high, None
+        for count in range(self.conf['maxTrials']):
+            if self.trial(frameSize, rate)['passed']:
+                best, low = rate, rate
+            else:
+                high = rate
+            if best == self.conf['maxRate'] or high - low <= self.conf['resolution']:
+                break
+            rate = round((low + high) / 2.0, 3)
+            if rate < self.conf['minRate']:
+                break
+        self.zeroLoss[frameSize] = best
+        print("Zero-loss rate for {} byte frames: {}".format(frameSize, "{}%".format(best) if best is not None else "not found"))
+        CaptureThat.info("SWEEP_ZERO_LOSS: {} bytes -> {}".format(frameSize, best))
+        return best
+
+    def run(self):
+        if self.conf.get('rfc2544'):
+            for frameSize in self.conf['frameSizes']:
+                self.zeroLossRate(frameSize)
+        else:
+            self.matrix()
+        return self.trials
+
+    def toPrettyTable(self):
+        Sweep_Table = prettytable.PrettyTable()
+        Sweep_Table.field_names = ['Frame Size', '% Line Rate', 'Tx Frames', 'Rx Frames', 'Loss %', 'Passed']
+        for result in self.trials:
+            Sweep_Table.add_row([result['frameSize'], result['rate'], int(result['txFrames']), int(result['rxFrames']), result['loss'], result['passed']])
+        return Sweep_Table
+
+################################################################################################
+#                                                                                              #
+#*_*_*_*_*_*_*_*_*_*_*_*_*_*_*   CLASS IxiaOrchestrator    *_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*_*#
+#                                                                                              #
+#   Runs one IxiaConnector session per API Server. Every chassis under "ixiaChassis" joins     #
+#   the session of its API Server: the top level ixiaVM/ixiaAPIServerPort, unless the chassis  #
+#   entry sets its own. Sessions run concurrently on a thread pool, so the wall-clock time     #
+#   follows the slowest session. A failing session is recorded in the report and does not      #
+#   stop the others.                                                                           #
+#                                                                                              #
+#   Init Variables                                                                             #
+#       -> IxiaJson: Parsed ixaDetails.yaml                                                    #
+#       -> trafficBuilder: Callable(IxiaConnector) returning the traffic item(s) to run. By    #
+#                          default the "traffic" section of the YAML is built                 #
+#                          With a "sweep" section they are swept by IxiaSweepRunner instead of #
+#                          being run once                                                      #
+#       -> maxWorkers: Size of the thread pool (default: one thread per session)               #
+#                                                                                              #
+#   Public Functions:                                                                          #
+#       -> run():            Run every session and return the merged report                    #
+#       -> printReport():    Print the per-session summary and the merged statistics           #
+#                                                                                              #
+################################################################################################
+class IxiaOrchestrator:
+    def __init__(self, IxiaJson, trafficBuilder=None, maxWorkers=None):
+        self.IxiaJson = IxiaJson
+        self.trafficBuilder = trafficBuilder
+        if self.trafficBuilder is None and IxiaJson.get('traffic'):
+            self.trafficBuilder = lambda ixHandler: ixHandler.createTrafficItems(IxiaJson['traffic'])
+        self.sessions = {}
+        for every in IxiaJson['ixiaChassis']:
+            vmip = every.get('ixiaVM', IxiaJson['ixiaVM'])
+            apiPort = every.get('ixiaAPIServerPort', IxiaJson['ixiaAPIServerPort'])
+            self.sessions.setdefault("{}:{}".format(vmip, apiPort), {'vmip': vmip, 'apiPort': apiPort, 'chassis': []})['chassis'].append(every)
+        self.maxWorkers = maxWorkers or len(self.sessions)
+
+    def run(self):
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix='IxiaSession') as pool:
+            futures = [pool.submit(self.runSession, session, sessionInfo) for session, sessionInfo in self.sessions.items()]
+            results = [future.result() for future in futures]
+        frames = [result['statistics'] for result in results if result['statistics'] is not None]
+        labels = [result['session'] for result in results if result['statistics'] is not None]
+        return {'sessions': results,
+                'wallTime': round(time.time() - start, 2),
+                'statistics': IxiaStatFrame.concat(frames, labels)}
+
+    def runSession(self, session, sessionInfo):
+        chassisList = sessionInfo['chassis']
+        result = {'session': session, 'chassis': [every['name'] for every in chassisList], 'status': 'passed',
+                  'error': None, 'stageTimes': {}, 'statistics': None, 'connector': None, 'sweep': None, 'snapshot': None}
+        stateFile = self.IxiaJson.get('stateFile', STATE_FILE).format(session.replace(':', '_')) if self.IxiaJson.get('reconfigure') else None
+        stage = 'connect'
+        try:
+            stageStart = time.time()
+            ixHandler = IxiaConnector(sessionInfo['vmip'], sessionInfo['apiPort'], result['chassis'][0], self.IxiaJson['ixVersion'],
+                                      self.IxiaJson.get('batchMode', False), self.IxiaJson.get('batchSize', 0), stateFile)
+            result['connector'] = ixHandler
+            if len(self.sessions) > 1:
+                ixHandler.snapshotSuffix = '_' + session.replace(':', '_')
+            result['stageTimes'][stage] = round(time.time() - stageStart, 2)
+
+            PortTupleList = buildPortTuples(chassisList)
+            stage = 'reconfigure'
+            stageStart = time.time()
+            stages = [('port assign', lambda: ixHandler.ConnectPhysicalPorts(PortTupleList)),
+                      ('scenario build', ixHandler.setScenarios)]
+            if ixHandler.reconfigure(PortTupleList):
+                result['stageTimes'][stage] = round(time.time() - stageStart, 2)
+                stages = []
+            for stage, action in stages + [('protocol start', ixHandler.startProtocols),
+                                           ('traffic', lambda: self.__runTraffic__(ixHandler, session, result)),
+                                           ('stats', lambda: self.__collectStatistics__(ixHandler, result))]:
+                stageStart = time.time()
+                action()
+                result['stageTimes'][stage] = round(time.time() - stageStart, 2)
+            ixHandler.saveState()
+            CaptureThat.info("SESSION_DONE: {} -> {}".format(session, result['stageTimes']))
+        except Exception as error:
+            if result['connector']:
+                result['connector'].clearState()
+            result['status'] = 'failed'
+            result['error'] = "{} failed: {}".format(stage, error)
+            print("Session {} failed during {}: {}".format(session, stage, error))
+            CaptureThat.error("SESSION_FAIL: {} failed during {}\n{}".format(session, stage, traceback.format_exc()))
+        finally:
+            if result['connector']:
+                result['connector'].closeStatConnections()
+        return result
+
+    def __runTraffic__(self, ixHandler, session, result):
+        TrafficItem = self.trafficBuilder(ixHandler) if self.trafficBuilder else None
+        if not TrafficItem:
+            return
+        if self.IxiaJson.get('sweep'):
+            result['sweep'] = IxiaSweepRunner(ixHandler, TrafficItem, self.IxiaJson['sweep'])
+            result['sweep'].run()
+            return
+        ixHandler.StartTraffic(TrafficItem)
+        if self.IxiaJson.get('statsStream'):
+            # Stream the live statistics to file until the fixedFrameCount traffic stops on its own
+            streamConf = self.IxiaJson['statsStream']
+            statFile = streamConf.get('file', 'IxiaNtastic_stats.jsonl')
+            if len(self.sessions) > 1:
+                base, extension = os.path.splitext(statFile)
+                statFile = "{}_{}{}".format(base, session.replace(':', '_'), extension)
+            statSink = IxiaStatSink(statFile)
+            with ixHandler.ixNet.stage('stats'):
+                for timestamp, view, row in ixHandler.streamStatistics(streamConf.get('views', STREAM_VIEWS), streamConf.get('interval', STREAM_INTERVAL),
+                                                                       streamConf.get('duration'), statSink, untilTrafficStops=True):
+                    pass
+            statSink.close()
+        else:
+            ixHandler.waitForTraffic('stopped', WAIT_TIMEOUTS['trafficRun'])      # fixedFrameCount traffic stops on its own
+        ixHandler.StopTraffic()
+
+    # Every view of "statViews" (default: STAT_VIEWS) is read concurrently. With statsSnapshot the
+    # Flow Statistics view is read as a CSV snapshot instead, next to the other views
+    def __collectStatistics__(self, ixHandler, result):
+        views = dict(self.IxiaJson.get('statViews') or STAT_VIEWS)
+        flowFrame = None
+        if self.IxiaJson.get('statsSnapshot', False) or 'Flow Statistics' not in views:
+            flowFrame = ixHandler.getTrafficStatistics(snapshot=self.IxiaJson.get('statsSnapshot', False))
+            views.pop('Flow Statistics', None)
+        collector = ixHandler.statisticsCollector()
+        frames = collector.collect(views) if views else {}
+        if flowFrame is not None:
+            frames['Flow Statistics'] = flowFrame
+        result['snapshot'] = collector.join(frames)
+        result['statistics'] = frames.get('Flow Statistics', IxiaStatFrame(columns=[]))
+        for row in result['statistics'].topLoss(5):
+            CaptureThat.info("TOP_LOSS: {} {}".format(result['session'], row))
+
+    def printReport(self, report):
+        Session_Table = prettytable.PrettyTable()
+        Session_Table.field_names = ['Session', 'Chassis', 'Status', 'Stage Times (s)', 'Round Trips', 'Error']
+        for result in report['sessions']:
+            ixHandler = result['connector']
+            Session_Table.add_row([result['session'], ", ".join(result['chassis']), result['status'], result['stageTimes'],
+                                   ixHandler.ixNet.roundTrips() if ixHandler else '-', result['error'] or ''])
+        print(Session_Table)
+        print("Wall time for all sessions: {}s".format(report['wallTime']))
+        CaptureThat.info("\n" + str(Session_Table))
+        CaptureThat.info("SESSIONS_WALLTIME: {}s".format(report['wallTime']))
+        for result in report['sessions']:
+            if result['snapshot'] is not None:
+                for joinName, keyCaption in [('port', 'Port'), ('trafficItem', 'Traffic Item')]:
+                    if result['snapshot'][joinName]:
+                        Join_Table = IxiaStatCollector.toPrettyTable(result['snapshot'][joinName], keyCaption)
+                        print("{} statistics of {}".format(keyCaption, result['session']))
+                        print(Join_Table)
+                        CaptureThat.info("STATS_{}: {}\n{}".format(joinName.upper(), result['session'], Join_Table))
+            if result['sweep'] is not None:
+                Sweep_Table = result['sweep'].toPrettyTable()
+                print("Traffic sweep of {}".format(result['session']))
+                print(Sweep_Table)
+                CaptureThat.info("SWEEP: {}\n{}".format(result['session'], Sweep_Table))
+        if len(report['statistics'].columns):
+            Stat_Table = report['statistics'].toPrettyTable()
+            print(Stat_Table)
+            CaptureThat.info("\n" + str(Stat_Table))
+
+
+# --validate-only/--dry-run summary of the configuration: what each session would build, without connecting
+def printPlan(IxiaJson, orchestrator=None):
+    ports = buildPortTuples(IxiaJson['ixiaChassis'])
+    print("Configuration: {} chassis, {} ports, {} device-groups, {} traffic items".format(
+        len(IxiaJson['ixiaChassis']), len(ports), sum(deviceGroupCount(tup[4]) for tup in ports), len(IxiaJson['traffic'])))
+    if orchestrator is None:
+        return
+    for session, sessionInfo in orchestrator.sessions.items():
+        PortTupleList = buildPortTuples(sessionInfo['chassis'])
+        print("Session {}: chassis {}, {} ports, {} device-groups (batchMode={}, reconfigure={})".format(
+            session, ", ".join(every['name'] for every in sessionInfo['chassis']), len(PortTupleList),
+            sum(deviceGroupCount(tup[4]) for tup in PortTupleList), IxiaJson['batchMode'], IxiaJson['reconfigure']))
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the IXIA scenarios described in a YAML file, run the traffic and report")
+    parser.add_argument('--config', default=YAML_FILE, help="YAML configuration (default: {})".format(YAML_FILE))
+    parser.add_argument('--validate-only', action='store_true', help="Parse and validate the configuration, then exit")
+    parser.add_argument('--dry-run', action='store_true', help="Validate and print what every session would build, without connecting")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the YAML, ignoring {}".format(CONFIG_CACHE_DIR))
+    args = parser.parse_args()
+
     #---------------------- LOGGING BLOCK   -----------------------------------
     # Create and configure logger
-    logging.basicConfig(filename="IxiaNtastic.log",format='%(asctime)s %(message)s',filemode='w')
+    logging.basicConfig(filename="IxiaNtastic.log",format='%(asctime)s %(threadName)s %(message)s',filemode='w')
     # Creating an Logger object
     CaptureThat = logging.getLogger()
     # Setting the threshold of logger to DEBUG
     CaptureThat.setLevel(logging.DEBUG)
 
     # ------------------- Extract Basic IXIA Details for establishing Connection ---------------------------
-    ChassisName = []
-    PortTupleList = []
-    IxiaJson = IxiaYamlExtractor()
+    try:
+        IxiaJson = IxiaYamlExtractor(args.config, None if args.no_cache else CONFIG_CACHE_DIR)
+    except ValueError as error:
+        print(error)
+        CaptureThat.fatal(str(error))
+        raise SystemExit(1)
+    if args.validate_only or args.dry_run:
+        printPlan(IxiaJson, IxiaOrchestrator(IxiaJson) if args.dry_run else None)
+        raise SystemExit(0)
     print(IxiaJson)
-    VM_IP = IxiaJson['ixiaVM']
-    API_port = IxiaJson['ixiaAPIServerPort']
-    ixVersion = IxiaJson['ixVersion']
 
-    # --------------------------------- Get Details of All Chassis ------------------------------------
-    for every in IxiaJson['ixiaChassis']:
-        for eachPort in every["ports"]:
-            tup = (every["name"], eachPort["slot"], eachPort["port"],eachPort["topology"]["name"],eachPort["topology"])
-            PortTupleList.append(tup)
-        ChassisName.append(every)
-
-    #---------------------------------- Ixia Connection-Handler ------------------------------------
-    ixHandler = IxiaConnector(VM_IP, API_port, ChassisName[0], ixVersion)
-    # Let's start assigning Physical Ports
-    ixHandler.ConnectPhysicalPorts(PortTupleList)
-
-    ixHandler.setScenarios()
-    ixHandler.startProtocols()
-    TrafficItem = ixHandler.createTraffic('Simple_IPv4', ["::ixNet::OBJ-/topology:1/deviceGroup:1/ethernet:1/ipv4:1"],
-                                     ["::ixNet::OBJ-/topology:2/deviceGroup:1/ethernet:1/ipv4:1"])
-
-    #-------------- Executing Traffic Item  -----------------------
-    ixHandler.StartTraffic(TrafficItem)
-    ixHandler.StopTraffic()
-    ixHandler.getTrafficStatistics()
+    #---------------------------------- One Ixia Connection-Handler per API Server ------------------------------------
+    orchestrator = IxiaOrchestrator(IxiaJson)
+    report = orchestrator.run()
+    orchestrator.printReport(report)
+    for result in report['sessions']:
+        ixHandler = result['connector']
+        if ixHandler:
+            CaptureThat.info("API round trips for {}: {} ({})".format(result['session'], ixHandler.ixNet.roundTrips(), ixHandler.ixNet.report()))
+            CaptureThat.info("Handle cache for {}: {}".format(result['session'], ixHandler.handleCache.report()))
+            CaptureThat.info("Wait times for {}: {}".format(result['session'], ixHandler.waiter.report()))
+            # ----------------- Which API verbs and which object paths (YAML subtrees) the run spent its time on ----------------
+            Verb_Table, Path_Table = ixHandler.ixNet.summaryTables()
+            print("API latency for {}".format(result['session']))
+            print(Verb_Table)
+            print(Path_Table)
+            CaptureThat.info("API_LATENCY: {}\n{}\n{}".format(result['session'], Verb_Table, Path_Table))
+    traceFile = IxNetProxy.exportTrace([ixNet for result in report['sessions'] if result['connector']
+                                        for ixNet in [result['connector'].ixNet] + result['connector'].statConnections],
+                                       IxiaJson.get('traceFile', TRACE_FILE))
+    print("API call trace written to {} (open in chrome://tracing or ui.perfetto.dev)".format(traceFile))
+    CaptureThat.info("TRACE_FILE: {}".format(traceFile))
     CaptureThat.info("")
     CaptureThat.info("")
     CaptureThat.info("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@   <<<<    END OF SCRIPT  >>>>>   @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")